@@ -0,0 +1,10 @@
+import json
+
+
+def corrupt_blob(path: str, doc_id: str, value: str = "!@#$%^&*()"):
+    """Replaces a document's encrypted blob in a JSON vault file with `value` (invalid by default)."""
+    with open(path, "rb") as f:
+        raw = json.loads(f.read())
+    raw["documents"][doc_id]["data"] = value
+    with open(path, "wb") as f:
+        f.write(json.dumps(raw).encode("utf-8"))
@@ -3,8 +3,9 @@ import sys
 import tempfile
 import json
 import stat
+import time
 import base64
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List
 
 import pytest
@@ -36,6 +37,7 @@ def key():
 def test_log_writes_encrypted_line(temp_log_path, key):
     log = VaultAuditLog(temp_log_path, key)
     log.log("insert", "abc123")
+    log.flush()
     with open(temp_log_path, "rb") as f:
         lines = f.readlines()
     assert len(lines) == 1
@@ -77,6 +79,7 @@ def test_file_permissions_set_on_creation(temp_log_path, key):
 def test_wrong_key_fails_to_decrypt_entries(temp_log_path, key):
     log1 = VaultAuditLog(temp_log_path, key)
     log1.log("insert", "secret")
+    log1.flush()
 
     bad_key = Fernet.generate_key()
     log2 = VaultAuditLog(temp_log_path, bad_key)
@@ -97,39 +100,35 @@ def test_missing_log_file_returns_empty(key):
     log = VaultAuditLog(path, key)
     assert log.entries() == []
 
-def test_log_handles_write_error_with_hook(temp_log_path, key):
+def test_log_handles_write_error_with_hook(temp_log_path, key, monkeypatch):
     captured = []
 
     def error_hook(exc):
         captured.append(str(exc))
 
     log = VaultAuditLog(temp_log_path, key, on_log_error=error_hook)
-    # Simulate write error by patching open
-    original_open = open
-    def broken_open(*args, **kwargs):
+    # Simulate write error by patching os.write, which the batch flush uses
+    def broken_write(*args, **kwargs):
         raise IOError("disk full")
 
-    try:
-        __builtins__["open"] = broken_open
-        log.log("insert", "fail")
-    finally:
-        __builtins__["open"] = original_open
+    monkeypatch.setattr("vaultedb.logging.os.write", broken_write)
+    log.log("insert", "fail")
+    log.flush()
+    monkeypatch.undo()
 
     assert any("disk full" in err for err in captured)
 
-def test_log_handles_write_error_silently_by_default(temp_log_path, key, caplog):
+def test_log_handles_write_error_silently_by_default(temp_log_path, key, caplog, monkeypatch):
     log = VaultAuditLog(temp_log_path, key)
-    original_open = open
 
-    def broken_open(*args, **kwargs):
+    def broken_write(*args, **kwargs):
         raise IOError("boom")
 
-    try:
-        __builtins__["open"] = broken_open
-        with caplog.at_level("WARNING"):
-            log.log("insert", "fail")
-    finally:
-        __builtins__["open"] = original_open
+    monkeypatch.setattr("vaultedb.logging.os.write", broken_write)
+    with caplog.at_level("WARNING"):
+        log.log("insert", "fail")
+        log.flush()
+    monkeypatch.undo()
 
     assert any("VaultAuditLog failed to log operation" in record.message for record in caplog.records)
 
@@ -141,6 +140,75 @@ def test_tail_more_than_total_returns_all(temp_log_path, key):
     assert len(tail) == 2
 
 
+def test_log_is_buffered_until_flush(temp_log_path, key):
+    log = VaultAuditLog(temp_log_path, key, flush_interval=0)
+    log.log("insert", "buffered")
+    assert os.path.getsize(temp_log_path) == 0
+    log.flush()
+    with open(temp_log_path, "rb") as f:
+        assert len(f.readlines()) == 1
+
+def test_collected_log_flushes_pending_entries(temp_log_path, key):
+    import gc
+    log = VaultAuditLog(temp_log_path, key, flush_interval=0)
+    log.log("insert", "doc-1")
+    del log
+    gc.collect()
+    assert [e["_id"] for e in VaultAuditLog(temp_log_path, key).entries()] == ["doc-1"]
+
+def test_log_flushes_when_buffer_is_full(temp_log_path, key):
+    log = VaultAuditLog(temp_log_path, key, buffer_size=3, flush_interval=0)
+    for i in range(3):
+        log.log("insert", f"id-{i}")
+    with open(temp_log_path, "rb") as f:
+        assert len(f.readlines()) == 3
+
+def test_log_flushes_after_interval(temp_log_path, key):
+    log = VaultAuditLog(temp_log_path, key, flush_interval=0.01)
+    log.log("insert", "timed")
+    deadline = time.time() + 2
+    while os.path.getsize(temp_log_path) == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert os.path.getsize(temp_log_path) > 0
+
+def test_group_durability_syncs_once_per_batch(temp_log_path, key, monkeypatch):
+    synced = []
+    monkeypatch.setattr("vaultedb.logging.datasync", synced.append)
+    log = VaultAuditLog(temp_log_path, key, flush_interval=0)
+    for i in range(5):
+        log.log("insert", f"id-{i}")
+    log.flush()
+    assert synced.count(log._fd) == 1
+
+def test_wait_returns_after_entry_is_synced(temp_log_path, key, monkeypatch):
+    synced = []
+    monkeypatch.setattr("vaultedb.logging.datasync", synced.append)
+    log = VaultAuditLog(temp_log_path, key, flush_interval=0)
+    log.log("insert", "durable", wait=True)
+    assert synced.count(log._fd) == 1
+    assert os.path.getsize(temp_log_path) > 0
+
+def test_sync_durability_writes_every_entry(temp_log_path, key, monkeypatch):
+    synced = []
+    monkeypatch.setattr("vaultedb.logging.datasync", synced.append)
+    log = VaultAuditLog(temp_log_path, key, flush_interval=0, durability="sync")
+    log.log("insert", "a")
+    log.log("insert", "b")
+    assert synced.count(log._fd) == 2
+
+def test_async_durability_never_syncs(temp_log_path, key, monkeypatch):
+    synced = []
+    monkeypatch.setattr("vaultedb.logging.datasync", synced.append)
+    log = VaultAuditLog(temp_log_path, key, durability="async")
+    log.log("insert", "a", wait=True)
+    assert log._fd not in synced
+    assert len(log.entries()) == 1
+
+def test_invalid_durability_raises(temp_log_path, key):
+    with pytest.raises(ValueError):
+        VaultAuditLog(temp_log_path, key, durability="eventually")
+
+
 # --- OPTIONAL CHECKS ---
 
 def test_audit_entry_contains_expected_keys(temp_log_path, key):
@@ -156,3 +224,42 @@ def test_entry_timestamp_is_iso8601(temp_log_path, key):
     # Should parse without exception
     parsed = datetime.fromisoformat(at)
     assert parsed.tzinfo is not None
+
+def test_entry_timestamp_is_current_utc(temp_log_path, key):
+    log = VaultAuditLog(temp_log_path, key)
+    log.log("get", "timecheck")
+    parsed = datetime.fromisoformat(log.entries()[0]["at"])
+    assert parsed.utcoffset().total_seconds() == 0
+    assert abs((datetime.now(timezone.utc) - parsed).total_seconds()) < 5
+
+def test_close_flushes_and_reopens_on_next_log(temp_log_path, key):
+    log = VaultAuditLog(temp_log_path, key, flush_interval=0)
+    log.log("insert", "before-close")
+    log.close()
+    with open(temp_log_path, "rb") as f:
+        assert len(f.readlines()) == 1
+    log.log("insert", "after-close")
+    assert [e["_id"] for e in log.entries()] == ["before-close", "after-close"]
+    log.close()
+
+def test_tail_reverse_scan_matches_entries(temp_log_path, key, monkeypatch):
+    monkeypatch.setattr("vaultedb.logging._TAIL_SCAN_THRESHOLD", 0)
+    log = VaultAuditLog(temp_log_path, key)
+    for i in range(20):
+        log.log("get", f"id-{i}")
+    assert log.tail(3) == log.entries()[-3:]
+    assert len(log.tail(50)) == 20
+
+def test_entries_reads_legacy_fernet_lines(temp_log_path, key):
+    legacy = Fernet(base64.urlsafe_b64encode(key)).encrypt(json.dumps({"op": "get", "_id": "old"}).encode())
+    with open(temp_log_path, "wb") as f:
+        f.write(legacy + b"\n")
+    log = VaultAuditLog(temp_log_path, key)
+    log.log("get", "new")
+    assert [e["_id"] for e in log.entries()] == ["old", "new"]
+
+def test_entries_on_large_log_keep_file_order(temp_log_path, key):
+    log = VaultAuditLog(temp_log_path, key, buffer_size=1000)
+    for i in range(150):
+        log.log("get", f"id-{i}")
+    assert [e["_id"] for e in log.entries()] == [f"id-{i}" for i in range(150)]
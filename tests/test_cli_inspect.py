@@ -120,3 +120,26 @@ def test_inspect_does_not_include_plaintext_fields():
     assert "value-0" not in result.stdout
     assert "field" not in result.stdout
     os.remove(path)
+
+def test_cli_does_not_import_cryptography():
+    result = subprocess.run(
+        ["python", "-c", "import sys, vaultedb.cli; print('cryptography' in sys.modules)"],
+        capture_output=True,
+        text=True
+    )
+    assert result.stdout.strip() == "False"
+
+def test_inspect_args_fast_path_matches_argparse_forms():
+    from vaultedb.cli import _parse_inspect_args
+    assert _parse_inspect_args(["inspect", "a.vault"]) == ("a.vault", 10, False, False)
+    assert _parse_inspect_args(["inspect", "-n", "3", "a.vault", "--json", "-q"]) == ("a.vault", 3, True, True)
+    # Left to argparse: help, "=" forms, negative or missing values, extra positionals
+    for argv in (["inspect", "-h"], ["inspect", "a.vault", "--max-ids=3"], ["inspect", "a.vault", "-n", "-3"],
+                 ["inspect", "a.vault", "-n"], ["inspect", "a.vault", "b.vault"], ["inspect"], []):
+        assert _parse_inspect_args(argv) is None
+
+def test_inspect_equals_form_uses_argparse():
+    path = create_test_vault(doc_count=5)
+    result = run_cli(["inspect", path, "--max-ids=2"])
+    assert "... and 3 more" in result.stdout
+    os.remove(path)
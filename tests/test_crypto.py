@@ -89,3 +89,106 @@ def test_generate_key_type_checks():
         generate_key(123, b"salt")
     with pytest.raises(TypeError):
         generate_key("ok", "not-bytes")
+
+
+def test_generate_key_returns_raw_256_bit_key(passphrase, salt):
+    assert len(generate_key(passphrase, salt)) == 32
+
+
+def test_decrypt_accepts_raw_and_base64_tokens(doc, key):
+    token = encrypt_document(doc, key)
+    assert isinstance(token, bytes)
+    assert decrypt_document(base64.urlsafe_b64encode(token).decode(), key) == doc
+
+
+def test_decrypt_legacy_fernet_token(doc, key):
+    import json
+    from cryptography.fernet import Fernet
+    legacy = Fernet(base64.urlsafe_b64encode(key)).encrypt(json.dumps(doc).encode()).decode()
+    assert decrypt_document(legacy, key) == doc
+
+
+def test_roundtrip_preserves_values_orjson_cannot_represent(key):
+    import math
+    doc = {"big": 2 ** 70 + 1, "negative": -2 ** 63 - 1, "nan": float("nan"), "inf": float("inf"), "none": None}
+    restored = decrypt_document(encrypt_document(doc, key), key)
+    assert isinstance(restored["big"], int) and restored["big"] == 2 ** 70 + 1
+    assert restored["negative"] == -2 ** 63 - 1
+    assert math.isnan(restored["nan"])
+    assert restored["inf"] == float("inf") and restored["none"] is None
+
+
+def test_decrypt_legacy_fernet_token_with_non_finite_floats(key):
+    import json
+    import math
+    from cryptography.fernet import Fernet
+    payload = json.dumps({"ratio": float("nan"), "limit": float("-inf")}).encode()
+    legacy = Fernet(base64.urlsafe_b64encode(key)).encrypt(payload).decode()
+    restored = decrypt_document(legacy, key)
+    assert math.isnan(restored["ratio"]) and restored["limit"] == float("-inf")
+
+
+def test_encrypt_non_json_value_raises(key):
+    from datetime import datetime
+    with pytest.raises(CryptoError, match="not JSON-serializable"):
+        encrypt_document({"when": datetime.now()}, key)
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_non_json_values_are_rejected_with_and_without_orjson(key, monkeypatch, use_orjson):
+    import enum
+    import uuid
+    from datetime import datetime
+    from vaultedb import _json
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr("vaultedb._json.orjson", None)
+
+    class Color(enum.Enum):
+        RED = 1
+
+    rejected = [{"id": uuid.uuid4()}, {"color": Color.RED}, {"nested": [{"color": Color.RED}]},
+                {uuid.uuid4(): 1}, {Color.RED: 1}, {datetime.now(): 1},
+                {"docs": {str(i): {"id": uuid.uuid4()} for i in range(20)}}]
+    for doc in rejected:
+        with pytest.raises(TypeError):
+            _json.dumps(doc)
+        with pytest.raises(CryptoError, match="not JSON-serializable"):
+            encrypt_document(doc, key)
+    # Keys and subclasses the stdlib accepts still work either way
+    assert _json.loads(_json.dumps({1: 1.5, None: enum.IntEnum("N", "ONE").ONE})) == {"1": 1.5, "null": 1}
+
+def test_encrypt_roundtrip_without_orjson(doc, key, monkeypatch):
+    monkeypatch.setattr("vaultedb._json.orjson", None)
+    token = encrypt_document(doc, key)
+    assert decrypt_document(token, key) == doc
+
+
+def test_cached_key_matches_and_can_be_cleared(passphrase, salt):
+    from vaultedb.crypto import _derive_key_cached, clear_key_cache
+    clear_key_cache()
+    assert _derive_key_cached(passphrase, salt) == generate_key(passphrase, salt)
+    assert _derive_key_cached.cache_info().currsize == 1
+    clear_key_cache()
+    assert _derive_key_cached.cache_info().currsize == 0
+
+def test_cipher_is_reused_for_same_key():
+    from vaultedb.crypto import _cipher_for, clear_key_cache
+    key = generate_key("cipher-cache", generate_salt())
+    assert _cipher_for(key) is _cipher_for(key)
+    assert decrypt_document(encrypt_document({"n": 1}, bytearray(key)), key) == {"n": 1}
+    clear_key_cache()
+    from vaultedb.crypto import _cached_cipher
+    assert _cached_cipher.cache_info().currsize == 0
+
+def test_decrypt_documents_matches_single_decrypt(doc, key):
+    import json
+    from cryptography.fernet import Fernet
+    from vaultedb.crypto import decrypt_documents
+    raw = encrypt_document(doc, key)
+    text = base64.urlsafe_b64encode(encrypt_document({"n": 2}, key)).decode()
+    legacy = Fernet(base64.urlsafe_b64encode(key)).encrypt(json.dumps({"n": 3}).encode()).decode()
+    assert decrypt_documents([raw, text, legacy], key) == [doc, {"n": 2}, {"n": 3}]
+    with pytest.raises(CryptoError):
+        decrypt_documents([raw, "not-a-token"], key)
@@ -36,6 +36,7 @@ def test_log_writes_encrypted_line(temp_vault_and_log, key):
     _, log_path = temp_vault_and_log
     log = VaultAuditLog(log_path, key)
     log.log("insert", "doc1")
+    log.flush()
     with open(log_path, "rb") as f:
         lines = f.readlines()
     assert len(lines) == 1
@@ -85,32 +86,28 @@ def test_export_json_writes_file(temp_vault_and_log, key):
     os.remove(export_path)
 
 
-def test_log_handles_write_error_with_hook(temp_vault_and_log, key):
+def test_log_handles_write_error_with_hook(temp_vault_and_log, key, monkeypatch):
     _, log_path = temp_vault_and_log
     errors = []
     def err_hook(e): errors.append(str(e))
     log = VaultAuditLog(log_path, key, on_log_error=err_hook)
-    original_open = open
-    def broken_open(*args, **kwargs): raise IOError("fail")
-    try:
-        __builtins__["open"] = broken_open
-        log.log("insert", "fail")
-    finally:
-        __builtins__["open"] = original_open
+    def broken_write(*args, **kwargs): raise IOError("fail")
+    monkeypatch.setattr("vaultedb.logging.os.write", broken_write)
+    log.log("insert", "fail")
+    log.flush()
+    monkeypatch.undo()
     assert any("fail" in e for e in errors)
 
 
-def test_log_handles_write_error_silently_by_default(temp_vault_and_log, key, caplog):
+def test_log_handles_write_error_silently_by_default(temp_vault_and_log, key, caplog, monkeypatch):
     _, log_path = temp_vault_and_log
     log = VaultAuditLog(log_path, key)
-    original_open = open
-    def broken_open(*args, **kwargs): raise IOError("boom")
-    try:
-        __builtins__["open"] = broken_open
-        with caplog.at_level(logging.WARNING):
-            log.log("insert", "fail")
-    finally:
-        __builtins__["open"] = original_open
+    def broken_write(*args, **kwargs): raise IOError("boom")
+    monkeypatch.setattr("vaultedb.logging.os.write", broken_write)
+    with caplog.at_level(logging.WARNING):
+        log.log("insert", "fail")
+        log.flush()
+    monkeypatch.undo()
     assert any("VaultAuditLog failed to log operation" in r.message for r in caplog.records)
 
 
@@ -118,6 +115,7 @@ def test_wrong_key_fails_to_decrypt_entries(temp_vault_and_log, key):
     _, log_path = temp_vault_and_log
     log = VaultAuditLog(log_path, key)
     log.log("insert", "secret")
+    log.flush()
     wrong_key = Fernet.generate_key()
     log2 = VaultAuditLog(log_path, wrong_key)
     with pytest.raises(CryptoError):
@@ -1,7 +1,7 @@
 import os
-import json
 import sys
 import tempfile
+import time
 import warnings
 
 import pytest
@@ -11,6 +11,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from vaultedb.encrypted_storage import EncryptedStorage
 from vaultedb.crypto import generate_key, generate_salt, CryptoError
 from vaultedb.errors import InvalidDocumentError, DuplicateIDError
+from _helpers import corrupt_blob
 
 @pytest.fixture
 def encrypted_store():
@@ -74,23 +75,13 @@ def test_list_documents(encrypted_store):
 
 def test_corrupt_data_strict_mode(encrypted_store):
     doc_id = encrypted_store.insert({"name": "Eve"})
-    with open(encrypted_store.store.path, "r+", encoding="utf-8") as f:
-        raw = json.load(f)
-        raw["documents"][doc_id]["data"] = "!@#$%^&*()"  # guaranteed invalid
-        f.seek(0)
-        json.dump(raw, f)
-        f.truncate()
+    corrupt_blob(encrypted_store.store.path, doc_id)  # guaranteed invalid
     with pytest.raises(CryptoError):
         encrypted_store.list(strict=True)
 
 def test_corrupt_data_non_strict_mode(encrypted_store):
     doc_id = encrypted_store.insert({"name": "Frank"})
-    with open(encrypted_store.store.path, "r+", encoding="utf-8") as f:
-        raw = json.load(f)
-        raw["documents"][doc_id]["data"] = "!@#$%^&*()"  # guaranteed invalid
-        f.seek(0)
-        json.dump(raw, f)
-        f.truncate()
+    corrupt_blob(encrypted_store.store.path, doc_id)  # guaranteed invalid
     docs = encrypted_store.list(strict=False)
     assert isinstance(docs, list)
     assert len(docs) == 0  # corrupted doc is skipped
@@ -151,3 +142,156 @@ def test_handles_large_vault_file(encrypted_store):
     assert len(result) == 1
     assert result[0]["msg"] == "doc-999"
 
+
+def test_large_vault_non_strict_skips_only_corrupt_docs(encrypted_store):
+    ids = [encrypted_store.insert({"index": i}) for i in range(100)]
+    corrupt_blob(encrypted_store.store.path, ids[50])
+    docs = encrypted_store.list(strict=False)
+    assert len(docs) == 99
+    assert [d["index"] for d in docs] == [i for i in range(100) if i != 50]
+    with pytest.raises(CryptoError):
+        encrypted_store.list(strict=True)
+
+@pytest.fixture
+def cached_store():
+    with tempfile.NamedTemporaryFile(suffix=".vault", delete=False) as tf:
+        path = tf.name
+    key = generate_key("cache-passphrase", generate_salt())
+    store = EncryptedStorage(path, key, cache_bytes=64 * 1024)
+    yield store
+    os.remove(path)
+
+def test_cached_get_skips_decryption(cached_store, monkeypatch):
+    doc_id = cached_store.insert({"name": "Cached"})
+    monkeypatch.setattr("vaultedb.encrypted_storage._decrypt_payload", None)  # any decrypt would fail
+    assert cached_store.get(doc_id)["name"] == "Cached"
+    assert [d["name"] for d in cached_store.list()] == ["Cached"]
+
+def test_cached_get_returns_independent_copies(cached_store):
+    doc_id = cached_store.insert({"tags": ["a"]})
+    cached_store.get(doc_id)["tags"].append("mutated")
+    assert cached_store.get(doc_id)["tags"] == ["a"]
+
+def test_cache_follows_update_delete_and_other_writers(cached_store):
+    doc_id = cached_store.insert({"name": "Before"})
+    cached_store.update(doc_id, {"name": "After"})
+    assert cached_store.get(doc_id)["name"] == "After"
+
+    other = EncryptedStorage(cached_store.store.path, cached_store.key)
+    other.update(doc_id, {"name": "Elsewhere"})
+    assert [d["name"] for d in cached_store.list()] == ["Elsewhere"]
+
+    cached_store.delete(doc_id)
+    assert cached_store.get(doc_id) is None
+
+def test_secure_wipe_empties_cache(cached_store):
+    cached_store.insert({"name": "Secret"})
+    cached_store.secure_wipe()
+    assert len(cached_store._cache) == 0
+
+def test_plaintext_cache_evicts_lru_and_expires(monkeypatch):
+    from vaultedb.cache import PlaintextCache
+    clock = [0.0]
+    monkeypatch.setattr("vaultedb.cache.time.monotonic", lambda: clock[0])
+    cache = PlaintextCache(max_bytes=40, ttl=10.0)
+    cache.put("a", "ta", b'{"n": 1}')
+    cache.put("b", "tb", b'{"n": 2}')
+    assert cache.get("a", "ta") == {"n": 1}
+    assert cache.get("a", "stale-token") is None
+    cache.put("c", "tc", b'{"n": 3, "pad": ""}')
+    cache.put("d", "td", b'{"n": 4, "pad": ""}')  # over budget: least recently used "b" goes first
+    assert cache.get("b", "tb") is None
+
+    clock[0] = 11.0
+    assert cache.get("c", "tc") is None  # idle longer than the TTL
+
+def test_vaults_share_one_decrypt_pool(encrypted_store, monkeypatch):
+    from vaultedb import _pool
+    monkeypatch.setattr(_pool, "_WORKERS", 4)  # exercise the pool even on a single-CPU machine
+    for i in range(_pool.PARALLEL_THRESHOLD):
+        encrypted_store.insert({"n": i})
+    encrypted_store.list()
+    pool = _pool._get_pool()
+    other = EncryptedStorage(encrypted_store.store.path, encrypted_store.key)
+    assert [d["n"] for d in other.list()] == list(range(_pool.PARALLEL_THRESHOLD))
+    assert _pool._get_pool() is pool
+
+def test_cached_find_repeats_without_decryption(cached_store, monkeypatch):
+    for i in range(5):
+        cached_store.insert({"n": i % 2})
+    assert len(cached_store.find({"n": 1})) == 2  # builds the snapshot
+
+    monkeypatch.setattr(cached_store, "_payload_for", None)  # any decrypt or cache lookup would fail
+    hits = cached_store.find({"n": 0})
+    assert len(hits) == 3
+    hits[0]["n"] = "mutated"
+    assert len(cached_store.find({"n": 0})) == 3
+    assert len(cached_store.list()) == 5
+
+def test_cached_snapshot_follows_writes(cached_store):
+    doc_id = cached_store.insert({"n": 1})
+    assert len(cached_store.find({"n": 1})) == 1
+    cached_store.update(doc_id, {"n": 2})
+    assert cached_store.find({"n": 1}) == []
+    cached_store.delete(doc_id)
+    assert cached_store.list() == []
+
+def test_cached_snapshot_expires_with_ttl(monkeypatch):
+    with tempfile.NamedTemporaryFile(suffix=".vault", delete=False) as tf:
+        path = tf.name
+    store = EncryptedStorage(path, generate_key("ttl-passphrase", generate_salt()), cache_bytes=64 * 1024,
+                             cache_ttl=0.01)
+    store.insert({"name": "Short-lived"})
+    assert len(store.list()) == 1  # builds the snapshot
+    time.sleep(0.05)
+    monkeypatch.setattr("vaultedb.encrypted_storage._decrypt_payload", None)  # any decrypt would fail
+    with pytest.raises(CryptoError):
+        store.list()  # nothing left to serve without decrypting
+    os.remove(path)
+
+def test_cached_snapshot_counts_against_cache_budget(cached_store):
+    for i in range(20):
+        cached_store.insert({"n": i, "pad": "x" * 200})
+    assert len(cached_store.list()) == 20  # builds the snapshot
+    snapshot = cached_store._snapshot
+    assert snapshot is not None
+    assert cached_store._cache._bytes <= cached_store._cache.max_bytes
+
+    cached_store.secure_wipe()
+    assert all(not any(payload) for _, payload in snapshot)
+    assert cached_store._snapshot is None and cached_store._cache._bytes == 0
+
+def test_cached_snapshot_is_skipped_when_over_budget():
+    with tempfile.NamedTemporaryFile(suffix=".vault", delete=False) as tf:
+        path = tf.name
+    store = EncryptedStorage(path, generate_key("budget-passphrase", generate_salt()), cache_bytes=16 * 1024)
+    for i in range(10):
+        store.insert({"n": i, "pad": "x" * 1000})  # ciphertext fits, plaintext plus parsed copies do not
+    assert len(store.list()) == 10
+    assert store._snapshot is None
+    assert store._cache._bytes <= store._cache.max_bytes
+    os.remove(path)
+
+def test_cached_find_matches_like_a_scan(cached_store):
+    cached_store.insert({"name": "A", "team": "red", "count": 10})
+    cached_store.insert({"name": "B", "team": "blue", "count": "10"})
+    cached_store.insert({"name": "C", "team": "red"})
+    assert [d["name"] for d in cached_store.find({"team": "red"})] == ["A", "C"]
+    assert [d["name"] for d in cached_store.find({"team": "red", "count": 10})] == ["A"]
+    assert [d["name"] for d in cached_store.find({"team": "red", "count": None})] == ["C"]
+    assert [d["name"] for d in cached_store.find({"tags": ["x"]})] == []
+    assert len(cached_store.find({})) == 3
+
+def test_encrypted_insert_many(encrypted_store):
+    ids = encrypted_store.insert_many([{"n": i} for i in range(3)])
+    reopened = EncryptedStorage(encrypted_store.store.path, encrypted_store.key)
+    assert [reopened.get(doc_id)["n"] for doc_id in ids] == [0, 1, 2]
+    with pytest.raises(InvalidDocumentError):
+        encrypted_store.insert_many([{"n": 3}, "invalid"])
+    assert len(reopened.list()) == 3
+
+def test_encrypted_batch_insert(encrypted_store):
+    with encrypted_store.batch():
+        ids = [encrypted_store.insert({"n": i}) for i in range(3)]
+    reopened = EncryptedStorage(encrypted_store.store.path, encrypted_store.key)
+    assert [reopened.get(doc_id)["n"] for doc_id in ids] == [0, 1, 2]
@@ -5,9 +5,11 @@ import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from vaultedb import encrypted_storage
 from vaultedb.encrypted_storage import EncryptedStorage
 from vaultedb.crypto import generate_key, generate_salt
 from vaultedb.errors import InvalidDocumentError, CryptoError
+from _helpers import corrupt_blob
 import tempfile
 
 @pytest.fixture
@@ -62,13 +64,129 @@ def test_find_skips_corrupt_data(vault):
     doc_id = vault.insert({"name": "ValidDoc"})
 
     # Corrupt the encrypted blob directly
-    with open(vault.store.path, "r+", encoding="utf-8") as f:
-        import json
-        raw = json.load(f)
-        raw["documents"][doc_id]["data"] = "!@#$%^&*()"
-        f.seek(0)
-        json.dump(raw, f)
-        f.truncate()
+    corrupt_blob(vault.store.path, doc_id)
 
     with pytest.raises(CryptoError):
         vault.find({"name": "ValidDoc"})  # uses strict=True
+
+def test_find_by_id_decrypts_only_that_document(vault, monkeypatch):
+    ids = [vault.insert({"name": f"user-{i}"}) for i in range(10)]
+    calls = []
+    original = encrypted_storage.decrypt_documents
+    monkeypatch.setattr(encrypted_storage, "decrypt_documents",
+                        lambda tokens, key: calls.extend(tokens) or original(tokens, key))
+    assert [d["name"] for d in vault.find({"_id": ids[3]})] == ["user-3"]
+    assert vault.find({"_id": ids[3], "name": "user-4"}) == []
+    assert vault.find({"_id": "missing"}) == []
+    assert len(calls) == 2
+
+def test_find_with_unhashable_filter_value(vault):
+    vault.insert({"tags": ["a", "b"], "name": "Tagged"})
+    vault.insert({"tags": ["c"], "name": "Other"})
+    results = vault.find({"tags": ["a", "b"]})
+    assert [d["name"] for d in results] == ["Tagged"]
+
+def test_find_missing_field_matches_none(vault):
+    vault.insert({"name": "NoEmail"})
+    vault.insert({"name": "HasEmail", "email": "x@example.com"})
+    results = vault.find({"email": None})
+    assert [d["name"] for d in results] == ["NoEmail"]
+
+@pytest.fixture
+def indexed_vault():
+    with tempfile.NamedTemporaryFile(suffix=".vault", delete=False) as tf:
+        path = tf.name
+    key = generate_key("index-test-passphrase", generate_salt())
+    store = EncryptedStorage(path, key, indexed_fields=("name", "age"))
+    yield store
+    os.remove(path)
+
+def test_indexed_find_matches_scan(indexed_vault):
+    for i in range(20):
+        indexed_vault.insert({"name": f"user-{i % 5}", "age": i % 3})
+    results = indexed_vault.find({"name": "user-1", "age": 1})
+    expected = [d for d in indexed_vault.list() if d["name"] == "user-1" and d["age"] == 1]
+    assert results == expected
+
+def test_indexed_find_decrypts_only_candidates(indexed_vault, monkeypatch):
+    for i in range(10):
+        indexed_vault.insert({"name": f"user-{i}"})
+    indexed_vault.find({"name": "user-0"})  # builds the index
+    calls = []
+    original = encrypted_storage.decrypt_documents
+    monkeypatch.setattr(encrypted_storage, "decrypt_documents",
+                        lambda tokens, key: calls.extend(tokens) or original(tokens, key))
+    assert len(indexed_vault.find({"name": "user-7"})) == 1
+    assert len(calls) == 1
+
+def test_indexed_find_follows_update_and_delete(indexed_vault):
+    doc_id = indexed_vault.insert({"name": "Alice", "age": 30})
+    assert len(indexed_vault.find({"name": "Alice"})) == 1
+    indexed_vault.update(doc_id, {"name": "Alicia"})
+    assert indexed_vault.find({"name": "Alice"}) == []
+    assert indexed_vault.find({"name": "Alicia"})[0]["_id"] == doc_id
+    indexed_vault.delete(doc_id)
+    assert indexed_vault.find({"name": "Alicia"}) == []
+
+def test_indexed_find_sees_insert_many(indexed_vault):
+    indexed_vault.find({"name": "warm-up"})  # builds the index
+    indexed_vault.insert_many([{"name": "Bulk"}, {"name": "Bulk"}, {"name": "Other"}])
+    assert len(indexed_vault.find({"name": "Bulk"})) == 2
+
+def test_indexed_find_keeps_equality_semantics(indexed_vault):
+    indexed_vault.insert({"name": "Flag", "age": 1})
+    indexed_vault.insert({"name": "Text", "age": "1"})
+    indexed_vault.insert({"name": "Missing"})
+    assert [d["name"] for d in indexed_vault.find({"age": True})] == ["Flag"]
+    assert [d["name"] for d in indexed_vault.find({"age": "1"})] == ["Text"]
+    assert [d["name"] for d in indexed_vault.find({"age": None})] == ["Missing"]
+
+def test_indexed_find_sees_writes_from_other_instances(indexed_vault):
+    indexed_vault.insert({"name": "First"})
+    assert len(indexed_vault.find({"name": "Second"})) == 0
+    other = EncryptedStorage(indexed_vault.store.path, indexed_vault.key)
+    other.insert({"name": "Second"})
+    assert len(indexed_vault.find({"name": "Second"})) == 1
+
+def test_auto_index_builds_field_on_first_find(monkeypatch):
+    with tempfile.NamedTemporaryFile(suffix=".vault", delete=False) as tf:
+        path = tf.name
+    vault = EncryptedStorage(path, generate_key("auto-index", generate_salt()), indexed_fields="auto")
+    for i in range(10):
+        vault.insert({"name": f"user-{i}", "age": i})
+
+    assert [d["age"] for d in vault.find({"name": "user-3"})] == [3]  # scans and indexes "name"
+    calls = []
+    original = encrypted_storage.decrypt_documents
+    monkeypatch.setattr(encrypted_storage, "decrypt_documents",
+                        lambda tokens, key: calls.extend(tokens) or original(tokens, key))
+    assert [d["age"] for d in vault.find({"name": "user-7"})] == [7]
+    assert len(calls) == 1
+
+    vault.insert({"name": "user-7", "age": 70})
+    assert sorted(d["age"] for d in vault.find({"name": "user-7"})) == [7, 70]
+    os.remove(path)
+
+def test_compiled_filters_are_per_vault_and_wiped(vault):
+    vault.insert({"ssn": "123-45-6789"})
+    assert len(vault.find({"ssn": "123-45-6789"})) == 1
+    assert vault._predicates.cache_info().currsize == 1
+
+    other = EncryptedStorage(vault.store.path, vault.key)
+    assert other._predicates.cache_info().currsize == 0
+    vault.secure_wipe()
+    assert vault._predicates.cache_info().currsize == 0
+    assert len(vault.find({"ssn": "123-45-6789"})) == 1
+
+def test_single_field_name_string_is_rejected():
+    with pytest.raises(ValueError, match="indexed_fields"):
+        EncryptedStorage("unused.vault", generate_key("index-str", generate_salt()), indexed_fields="email")
+    assert not os.path.exists("unused.vault")
+
+def test_find_multi_field_filter_with_none(vault):
+    vault.insert({"tag": "a", "status": "draft", "n": 1})
+    vault.insert({"tag": "a", "status": "draft", "n": 1, "owner": "x"})
+    vault.insert({"tag": "a", "status": "final", "n": 1})
+    results = vault.find({"owner": None, "tag": "a", "status": "draft", "n": 1.0})
+    assert len(results) == 1
+    assert "owner" not in results[0]
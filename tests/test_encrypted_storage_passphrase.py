@@ -8,7 +8,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from vaultedb import vaultedb
 from vaultedb.errors import CryptoError
-from vaultedb.storage import DocumentStorage
+from vaultedb.storage import DocumentStorage, StorageFormat
 
 @pytest.fixture
 def temp_vault_path():
@@ -110,4 +110,25 @@ def test_cross_vault_decryption_fails_with_same_passphrase():
         vault2.get("shared-id")
 
     os.remove(p1)
-    os.remove(p2)
\ No newline at end of file
+    os.remove(p2)
+
+def test_open_msgpack_vault_roundtrip(temp_vault_path):
+    pytest.importorskip("msgpack")
+    vault = vaultedb.open(temp_vault_path, "packed", file_format=StorageFormat.MSGPACK)
+    vault.insert({"_id": "p1", "msg": "binary"})
+
+    reopened = vaultedb.open(temp_vault_path, "packed")
+    assert reopened.store.file_format == StorageFormat.MSGPACK
+    assert reopened.get("p1")["msg"] == "binary"
+    os.remove(temp_vault_path)
+
+def test_msgpack_vault_stores_raw_ciphertext(temp_vault_path):
+    pytest.importorskip("msgpack")
+    vault = vaultedb.open(temp_vault_path, "packed", file_format=StorageFormat.MSGPACK)
+    vault.insert({"_id": "p1", "msg": "binary"})
+    vault.update("p1", {"msg": "still binary"})
+
+    raw = vault.store.get("p1")["data"]
+    assert isinstance(raw, bytes)
+    assert vaultedb.open(temp_vault_path, "packed").get("p1")["msg"] == "still binary"
+    os.remove(temp_vault_path)
@@ -1,6 +1,7 @@
 import json
 import re
 import tempfile
+import uuid
 import os
 from datetime import datetime, timezone
 
@@ -10,7 +11,7 @@ from unittest.mock import patch
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from vaultedb.storage import DocumentStorage
+from vaultedb.storage import DocumentStorage, StorageFormat, MSGPACK_MAGIC
 from vaultedb.errors import InvalidDocumentError, DuplicateIDError, StorageError
 
 
@@ -29,6 +30,16 @@ def test_insert_and_get(temp_storage_path):
     assert loaded["name"] == "Alice"
     assert loaded["_id"] == doc_id
 
+def test_generated_ids_are_unique_uuid4_strings(temp_storage_path):
+    store = DocumentStorage(temp_storage_path)
+    with store.batch():
+        ids = [store.insert({"n": i}) for i in range(600)]  # spans several id refills
+    assert len(set(ids)) == len(ids)
+    for doc_id in ids:
+        parsed = uuid.UUID(doc_id)
+        assert parsed.version == 4
+        assert str(parsed) == doc_id
+
 def test_metadata_written(temp_storage_path):
     store = DocumentStorage(temp_storage_path, app_name="MyJournal")
     store.insert({"title": "First Entry"})
@@ -119,6 +130,32 @@ def test_atomic_write_failure_does_not_corrupt_file(temp_storage_path):
         assert doc_id in data["documents"]
         assert data["documents"][doc_id]["name"] == "SafeDoc"
 
+    # The failed write's temp file is cleaned up
+    prefix = os.path.basename(temp_storage_path) + "."
+    assert not [name for name in os.listdir(os.path.dirname(temp_storage_path)) if name.startswith(prefix)]
+
+def test_insert_many_writes_once(temp_storage_path):
+    store = DocumentStorage(temp_storage_path)
+    with patch.object(DocumentStorage, "_atomic_write", autospec=True,
+                      side_effect=DocumentStorage._atomic_write) as write:
+        ids = store.insert_many([{"n": i} for i in range(5)])
+    assert write.call_count == 1
+    assert [DocumentStorage(temp_storage_path).get(doc_id)["n"] for doc_id in ids] == list(range(5))
+
+def test_insert_many_is_all_or_nothing(temp_storage_path):
+    store = DocumentStorage(temp_storage_path)
+    existing = store.insert({"name": "Existing"})
+    with pytest.raises(DuplicateIDError):
+        store.insert_many([{"name": "New"}, {"_id": existing, "name": "Clash"}])
+    with pytest.raises(DuplicateIDError):
+        store.insert_many([{"_id": "same"}, {"_id": "same"}])
+    with pytest.raises(InvalidDocumentError):
+        store.insert_many([{"name": "Fine"}, ["invalid"]])
+    with patch("vaultedb.storage.os.replace", side_effect=Exception("Simulated crash")):
+        with pytest.raises(StorageError):
+            store.insert_many([{"name": "Lost"}])
+    assert [doc["name"] for doc in store.data.values()] == ["Existing"]
+
 def test_legacy_file_format_raises_storage_error(temp_storage_path):
     # Write legacy export_format (no _meta, no documents key)
     legacy_data = {
@@ -166,3 +203,296 @@ def test_meta_allows_custom_fields(temp_storage_path):
     store.meta.update({"env": "staging"})
     assert store.meta["label"] == "project-alpha"
     assert store.meta["env"] == "staging"
+
+def test_meta_update_accepts_pairs_and_keywords(temp_storage_path):
+    store = DocumentStorage(temp_storage_path)
+    store.meta.update((pair for pair in [("env", "prod")]), region="eu")
+    assert store.meta["env"] == "prod" and store.meta["region"] == "eu"
+    with pytest.raises(RuntimeError, match=re.escape("'salt' is read-only metadata")):
+        store.meta.update([("label", "x")], salt="forged")
+    assert "label" not in store.meta
+
+def test_msgpack_format_roundtrip(temp_storage_path):
+    pytest.importorskip("msgpack")
+    store = DocumentStorage(temp_storage_path, app_name="PackedApp", file_format=StorageFormat.MSGPACK)
+    doc_id = store.insert({"name": "Packed"})
+
+    with open(temp_storage_path, "rb") as f:
+        assert f.read(len(MSGPACK_MAGIC)) == MSGPACK_MAGIC
+
+    reloaded = DocumentStorage(temp_storage_path)
+    assert reloaded.file_format == StorageFormat.MSGPACK
+    assert reloaded.get(doc_id)["name"] == "Packed"
+    assert reloaded.meta["app_name"] == "PackedApp"
+
+def test_existing_json_vault_keeps_json_format(temp_storage_path):
+    DocumentStorage(temp_storage_path).insert({"name": "Plain"})
+    store = DocumentStorage(temp_storage_path, file_format=StorageFormat.MSGPACK)
+    assert store.file_format == StorageFormat.JSON
+
+def test_corrupt_msgpack_raises_storage_error(temp_storage_path):
+    pytest.importorskip("msgpack")
+    with open(temp_storage_path, "wb") as f:
+        f.write(MSGPACK_MAGIC + b"\xc1garbage")
+    with pytest.raises(StorageError):
+        DocumentStorage(temp_storage_path)
+
+def test_journal_appends_without_rewriting_snapshot(temp_storage_path):
+    store = DocumentStorage(temp_storage_path, journal=True)
+    first = store.insert({"name": "First"})  # establishes the snapshot the journal builds on
+    with open(temp_storage_path, "rb") as f:
+        snapshot = f.read()
+
+    second = store.insert({"name": "Second"})
+    store.update(first, {"name": "Renamed"})
+    store.delete(second)
+
+    with open(temp_storage_path, "rb") as f:
+        assert f.read() == snapshot
+    assert os.path.exists(temp_storage_path + ".journal")
+
+    reloaded = DocumentStorage(temp_storage_path)
+    assert reloaded.get(first)["name"] == "Renamed"
+    assert reloaded.get(second) is None
+
+def test_journal_is_folded_in_by_compaction(temp_storage_path):
+    store = DocumentStorage(temp_storage_path, journal=True)
+    store.insert({"name": "First"})
+    doc_id = store.insert({"name": "Second"})
+    store.compact()
+
+    assert not os.path.exists(temp_storage_path + ".journal")
+    with open(temp_storage_path, "r", encoding="utf-8") as f:
+        assert json.load(f)["documents"][doc_id]["name"] == "Second"
+
+def test_journal_compacts_once_it_outgrows_snapshot(temp_storage_path, monkeypatch):
+    monkeypatch.setattr("vaultedb.storage._MIN_COMPACT_BYTES", 0)
+    store = DocumentStorage(temp_storage_path, journal=True)
+    for i in range(10):
+        store.insert({"n": i})
+    assert len(DocumentStorage(temp_storage_path).list()) == 10
+    assert os.path.getsize(temp_storage_path + ".journal") <= os.path.getsize(temp_storage_path)
+
+def test_stale_journal_is_not_replayed(temp_storage_path):
+    store = DocumentStorage(temp_storage_path, journal=True)
+    store.insert({"name": "First"})
+    doc_id = store.insert({"name": "Second"})
+    with open(temp_storage_path + ".journal", "rb") as f:
+        journal = f.read()
+
+    store.delete(doc_id)
+    store.compact()
+    # Simulate a crash between writing the snapshot and removing the old journal
+    with open(temp_storage_path + ".journal", "wb") as f:
+        f.write(journal)
+
+    assert DocumentStorage(temp_storage_path).get(doc_id) is None
+
+def test_torn_journal_record_is_ignored(temp_storage_path):
+    store = DocumentStorage(temp_storage_path, journal=True)
+    store.insert({"name": "First"})
+    doc_id = store.insert({"name": "Second"})
+    with open(temp_storage_path + ".journal", "ab") as f:
+        f.write(b'{"op": "put", "_id": "torn", "doc": {"na')
+
+    reloaded = DocumentStorage(temp_storage_path)
+    assert reloaded.get(doc_id)["name"] == "Second"
+    assert reloaded.get("torn") is None
+
+@pytest.mark.parametrize("file_format", [StorageFormat.JSON, StorageFormat.MSGPACK])
+def test_append_after_torn_journal_record_is_kept(temp_storage_path, file_format):
+    if file_format == StorageFormat.MSGPACK:
+        pytest.importorskip("msgpack")
+    store = DocumentStorage(temp_storage_path, file_format=file_format, journal=True)
+    store.insert({"_id": "a"})
+    store.insert({"_id": "b"})
+    store.close()
+    with open(temp_storage_path + ".journal", "ab") as f:
+        f.write(store._encode_record({"op": "put", "_id": "torn", "doc": {"_id": "torn"}})[:-3])
+
+    writer = DocumentStorage(temp_storage_path, journal=True)
+    writer.insert({"_id": "c"})
+    writer.close()
+    assert sorted(DocumentStorage(temp_storage_path).data) == ["a", "b", "c"]
+
+def test_msgpack_journal_roundtrip(temp_storage_path):
+    pytest.importorskip("msgpack")
+    store = DocumentStorage(temp_storage_path, file_format=StorageFormat.MSGPACK, journal=True)
+    store.insert({"name": "First"})
+    doc_id = store.insert({"name": "Second"})
+    assert DocumentStorage(temp_storage_path).get(doc_id)["name"] == "Second"
+
+def test_journal_is_private_and_reopened_after_close(temp_storage_path):
+    store = DocumentStorage(temp_storage_path, journal=True)
+    store.insert({"name": "First"})
+    store.insert({"name": "Second"})
+    assert os.stat(temp_storage_path + ".journal").st_mode & 0o777 == 0o600
+
+    store.close()
+    doc_id = store.insert({"name": "Third"})
+    assert DocumentStorage(temp_storage_path).get(doc_id)["name"] == "Third"
+    store.close()
+
+def test_journal_write_after_other_writer_folded_it_is_not_lost(temp_storage_path):
+    writer = DocumentStorage(temp_storage_path, journal=True)
+    writer.insert({"_id": "a1"})
+    writer.insert({"_id": "a2"})  # journaled, fd stays open
+    DocumentStorage(temp_storage_path).insert({"_id": "b1"})  # rewrites the vault, removes the journal
+
+    with pytest.raises(StorageError, match="another writer"):
+        writer.insert({"_id": "a3"})
+    assert sorted(writer.data) == ["a1", "a2", "b1"]  # back in sync with disk
+
+    writer.insert({"_id": "a4"})
+    assert sorted(DocumentStorage(temp_storage_path).data) == ["a1", "a2", "a4", "b1"]
+    writer.close()
+
+def test_concurrent_journal_writers_do_not_drop_records(temp_storage_path):
+    DocumentStorage(temp_storage_path, journal=True).insert({"_id": "base"})
+    first = DocumentStorage(temp_storage_path, journal=True)
+    second = DocumentStorage(temp_storage_path, journal=True)
+    first.insert({"_id": "one"})
+    with pytest.raises(StorageError):
+        second.insert({"_id": "two"})  # would have truncated first's journal
+    second.insert({"_id": "two"})
+    assert sorted(DocumentStorage(temp_storage_path).data) == ["base", "one", "two"]
+    first.close()
+    second.close()
+
+@pytest.mark.parametrize("write", ["batch", "insert_many", "compact"])
+def test_snapshot_rewrite_keeps_other_writers_journal_records(temp_storage_path, write):
+    DocumentStorage(temp_storage_path, journal=True).insert({"_id": "base"})
+    a = DocumentStorage(temp_storage_path, journal=True)
+    b = DocumentStorage(temp_storage_path, journal=True)
+    b.insert({"_id": "from_b"})  # journaled
+
+    with pytest.raises(StorageError, match="another writer"):
+        if write == "batch":
+            with a.batch():
+                a.insert({"_id": "from_a"})
+        elif write == "insert_many":
+            a.insert_many([{"_id": "from_a"}])
+        else:
+            a.compact()
+    assert "from_b" in a.data  # reloaded from disk
+    assert sorted(DocumentStorage(temp_storage_path).data) == ["base", "from_b"]
+
+    a.insert_many([{"_id": "from_a"}])
+    assert sorted(DocumentStorage(temp_storage_path).data) == ["base", "from_a", "from_b"]
+    a.close()
+    b.close()
+
+def test_journal_persists_meta_changes(temp_storage_path):
+    store = DocumentStorage(temp_storage_path, journal=True)
+    store.insert({"name": "Base"})
+    store.meta["label"] = "alpha"
+    store.insert({"name": "Journaled"})
+    store.list()
+    assert store.meta.get("label") == "alpha"
+    assert DocumentStorage(temp_storage_path).meta.get("label") == "alpha"
+    store.close()
+
+def test_journal_append_is_synced(temp_storage_path, monkeypatch):
+    store = DocumentStorage(temp_storage_path, journal=True)
+    store.insert({"name": "Base"})  # first write is a snapshot
+    synced = []
+    monkeypatch.setattr("vaultedb.storage.datasync", synced.append)
+    store.insert({"name": "Appended"})
+    assert synced == [store._journal_fd]
+    store.close()
+
+def test_loads_stdlib_written_vault_with_non_finite_floats_and_big_ints(temp_storage_path):
+    legacy = {
+        "_meta": {"created_at": "2024-01-01T00:00:00+00:00", "vault_version": "1.0.0"},
+        "documents": {"doc": {"_id": "doc", "limit": float("inf"), "ratio": float("nan"), "big": 2 ** 70}},
+    }
+    with open(temp_storage_path, "w", encoding="utf-8") as f:
+        json.dump(legacy, f, indent=2)  # as written before the orjson wrapper
+
+    store = DocumentStorage(temp_storage_path)
+    store.insert({"_id": "new", "ratio": float("nan")})
+    for loaded in (store, DocumentStorage(temp_storage_path)):
+        doc = loaded.get("doc")
+        assert doc["limit"] == float("inf") and doc["ratio"] != doc["ratio"]
+        assert isinstance(doc["big"], int) and doc["big"] == 2 ** 70
+        assert loaded.get("new")["ratio"] != loaded.get("new")["ratio"]  # NaN, not None
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_json_vault_roundtrip_with_and_without_orjson(temp_storage_path, monkeypatch, use_orjson):
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr("vaultedb._json.orjson", None)
+    store = DocumentStorage(temp_storage_path, app_name="Ünicode")
+    doc_id = store.insert({"name": "Zoë"})
+    with open(temp_storage_path, "r", encoding="utf-8") as f:
+        assert json.load(f)["documents"][doc_id]["name"] == "Zoë"
+    assert DocumentStorage(temp_storage_path).meta["app_name"] == "Ünicode"
+
+def test_batch_writes_file_once(temp_storage_path):
+    store = DocumentStorage(temp_storage_path)
+    with patch.object(store, "_atomic_write", wraps=store._atomic_write) as write:
+        with store.batch():
+            ids = [store.insert({"n": i}) for i in range(5)]
+            store.update(ids[0], {"n": 100})
+            store.delete(ids[1])
+            assert len(store.list()) == 4  # sees its own unsaved changes
+        assert write.call_count == 1
+
+    reloaded = DocumentStorage(temp_storage_path)
+    assert reloaded.get(ids[0])["n"] == 100
+    assert reloaded.get(ids[1]) is None
+    assert len(reloaded.list()) == 4
+
+def test_batch_writes_even_if_block_raises(temp_storage_path):
+    store = DocumentStorage(temp_storage_path)
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            doc_id = store.insert({"n": 1})
+            raise RuntimeError("boom")
+    assert DocumentStorage(temp_storage_path).get(doc_id)["n"] == 1
+
+def _age_file(path, seconds=10):
+    st = os.stat(path)
+    old = st.st_mtime_ns - seconds * 1_000_000_000
+    os.utime(path, ns=(old, old))
+
+def test_unchanged_file_is_not_parsed_again(temp_storage_path, monkeypatch):
+    doc_id = DocumentStorage(temp_storage_path).insert({"name": "Cached"})
+    _age_file(temp_storage_path)
+    first = DocumentStorage(temp_storage_path)
+
+    monkeypatch.setattr("vaultedb.storage._json.loads", None)  # any parse would fail
+    second = DocumentStorage(temp_storage_path)
+    assert second.get(doc_id)["name"] == "Cached"
+
+    second.get(doc_id)["name"] = "Mutated"
+    assert first.get(doc_id)["name"] == "Cached"
+    assert DocumentStorage(temp_storage_path).get(doc_id)["name"] == "Cached"
+
+def test_reload_skips_unchanged_file(temp_storage_path, monkeypatch):
+    DocumentStorage(temp_storage_path).insert({"name": "Stable"})
+    _age_file(temp_storage_path)
+    store = DocumentStorage(temp_storage_path)
+    generation = store.generation
+
+    with patch.object(DocumentStorage, "_load", side_effect=AssertionError("file was re-read")):
+        assert [d["name"] for d in store.list()] == ["Stable"]
+    assert store.generation == generation
+
+    DocumentStorage(temp_storage_path).insert({"name": "External"})
+    assert sorted(d["name"] for d in store.list()) == ["External", "Stable"]
+
+def test_changed_file_is_parsed_again(temp_storage_path):
+    store = DocumentStorage(temp_storage_path)
+    doc_id = store.insert({"name": "Before"})
+    _age_file(temp_storage_path)
+    DocumentStorage(temp_storage_path)
+
+    with open(temp_storage_path, "r+", encoding="utf-8") as f:
+        raw = json.load(f)
+        raw["documents"][doc_id]["name"] = "After!"
+        f.seek(0)
+        json.dump(raw, f)
+        f.truncate()
+    assert DocumentStorage(temp_storage_path).get(doc_id)["name"] == "After!"
@@ -1,2 +1,10 @@
 # vaultedb/__init__.py
-from .encrypted_storage import EncryptedStorage as vaultedb
\ No newline at end of file
+__all__ = ["vaultedb"]
+
+
+def __getattr__(name):
+    # EncryptedStorage pulls in cryptography; importing it lazily keeps `python -m vaultedb.cli` light
+    if name == "vaultedb":
+        from .encrypted_storage import EncryptedStorage
+        return EncryptedStorage
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
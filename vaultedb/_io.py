@@ -0,0 +1,17 @@
+"""
+Low-level file writes shared by the vault storage and the audit log.
+"""
+
+import os
+
+# fdatasync skips the inode metadata flush; not every platform has it
+datasync = getattr(os, "fdatasync", os.fsync)
+
+
+def write_all(fd: int, data: bytes):
+    """
+    Writes all of `data` to `fd`, continuing after short writes.
+    """
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
@@ -0,0 +1,87 @@
+"""
+vaultedb JSON helpers
+
+Thin wrapper that uses orjson when it is installed and falls back to the stdlib `json` module.
+- `dumps` always returns UTF-8 encoded bytes
+- `loads` accepts str or bytes
+- Values orjson cannot represent exactly (NaN/Infinity, integers beyond 64 bits) and types only
+  orjson accepts (UUIDs, enums, non-string keys, ...) go through the stdlib in both directions,
+  so results and errors never depend on which encoder is installed
+"""
+
+import json
+import math
+from itertools import chain
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speed-up
+    orjson = None
+
+
+# Maps every digit to b"0" and everything else to b" ", to find long digit runs without a regex
+_DIGIT_MASK = bytes(48 if 48 <= c <= 57 else 32 for c in range(256))
+# Shortest digit run that can hold an integer outside orjson's 64-bit range (it parses those as floats)
+_WIDE_INT_DIGITS = b"0" * 19
+
+
+# Exact types both encoders write identically; floats also do once NaN/Infinity are ruled out
+_SCALAR_TYPES = frozenset((str, int, bool, type(None)))
+_CONTAINER_TYPES = frozenset((dict, list, tuple))
+_DICT_TYPES = {dict}
+# Containers at least this long are first checked in bulk, without a Python-level loop
+_BULK_CHECK_SIZE = 16
+
+
+def _needs_stdlib(obj: Any) -> bool:
+    """
+    Whether `obj` holds a value other than plain JSON types and finite floats.
+
+    orjson also encodes UUIDs, enums and other types the stdlib rejects (and NaN as null), so
+    objects holding them are left to the stdlib. Dict keys are not checked here: without
+    OPT_NON_STR_KEYS orjson rejects any key that is not a string.
+    """
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+        items = value.values() if kind is dict else value if kind is list or kind is tuple else (value,)
+        if len(items) >= _BULK_CHECK_SIZE:
+            kinds = set(map(type, items))
+            if _SCALAR_TYPES.issuperset(kinds):
+                continue
+            if kinds == _DICT_TYPES and _SCALAR_TYPES.issuperset(map(type, chain.from_iterable(map(dict.values, items)))):
+                continue  # e.g. the documents of a vault file
+        for item in items:
+            kind = type(item)
+            if kind in _SCALAR_TYPES:
+                continue
+            if kind in _CONTAINER_TYPES:
+                stack.append(item)
+            elif kind is not float or not math.isfinite(item):
+                return True
+    return False
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """
+    Serializes `obj` compactly, or with 2-space indentation when `indent` is set.
+    """
+    if orjson is not None and not _needs_stdlib(obj):
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+        except TypeError:
+            pass  # non-string keys or integers wider than 64 bits; let the stdlib encoder decide
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        raw = data.encode("utf-8") if isinstance(data, str) else bytes(data) if isinstance(data, memoryview) else data
+        if _WIDE_INT_DIGITS not in raw.translate(_DIGIT_MASK):
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                pass  # e.g. NaN/Infinity written by the stdlib encoder; the stdlib decides
+    return json.loads(data)
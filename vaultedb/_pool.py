@@ -0,0 +1,88 @@
+"""
+Process-wide thread pool for bulk decryption.
+
+AES-GCM runs inside OpenSSL with the GIL released, so decrypting many documents or log lines
+scales across cores. Every vault and audit log shares this one pool instead of owning threads.
+"""
+
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Below this many items, thread dispatch costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+# CPUs this process may run on (affinity/cgroup-aware where the platform supports it)
+_WORKERS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+# Smallest batch handed to a worker; smaller chunks spend their time on queue contention
+_MIN_CHUNKSIZE = 32
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix="vaultedb")
+    return _pool
+
+
+def _chunksize(count: int) -> int:
+    # About four chunks per worker keeps them evenly loaded
+    return max(_MIN_CHUNKSIZE, count // (_WORKERS * 4))
+
+
+def _use_pool(count: int) -> bool:
+    # With a single usable CPU the pool only adds dispatch overhead
+    return _WORKERS > 1 and count >= PARALLEL_THRESHOLD
+
+
+def parallel_map(fn: Callable[[T], R], items: Sequence[T]) -> Iterable[R]:
+    """
+    Maps `fn` over `items` in order, on the shared pool once there are enough items.
+    """
+    if not _use_pool(len(items)):
+        return map(fn, items)
+    return _get_pool().map(fn, items, chunksize=_chunksize(len(items)))
+
+
+def parallel_chunks(fn: Callable[[Sequence[T]], List[R]], items: Sequence[T]) -> List[R]:
+    """
+    Applies a batch function to slices of `items` and concatenates the results in order.
+
+    Small inputs (or a single usable CPU) are handled in one call on the calling thread.
+    """
+    if not _use_pool(len(items)):
+        return fn(items)
+    size = _chunksize(len(items))
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+    results: List[R] = []
+    for chunk_result in _get_pool().map(fn, chunks):
+        results.extend(chunk_result)
+    return results
+
+
+def _reset_after_fork():
+    # Worker threads do not survive fork(); the child builds its own pool on first use
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+@atexit.register
+def _shutdown():
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,117 @@
+"""
+vaultedb Cache Module
+
+Opt-in in-memory cache of decrypted documents used by EncryptedStorage.
+- Keeps each document's plaintext JSON, keyed by _id and tied to the ciphertext it came from
+- Every hit is parsed into a fresh dict, so callers may mutate results freely
+- Bounded by a byte budget (least recently used entries go first) and an idle TTL
+  that shrinks as the cache fills up; plaintext its owner keeps elsewhere can be reserved
+  against the same budget
+- Holds plaintext in process memory; `wipe()` overwrites and drops it (best effort)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+from vaultedb import _json
+
+Token = Union[str, bytes]
+
+
+class PlaintextCache:
+    """
+    LRU cache of decrypted document payloads.
+
+    An entry only counts as a hit while the stored ciphertext is unchanged, so writes made by
+    other instances (picked up on reload) never return stale plaintext.
+
+    TTL under memory pressure: with `m = max(0, (used - low) / (high - low))`, where `high` is
+    `max_bytes` and `low` half of it, entries idle for longer than `ttl * (1 - m)` are expired.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float = 300.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # doc_id -> (ciphertext token, plaintext JSON, last used)
+        self._entries: "OrderedDict[str, Tuple[Token, bytearray, float]]" = OrderedDict()
+        self._bytes = 0  # cached plaintext plus the reservation
+        self._reserved = 0
+        self._lock = threading.Lock()
+
+    def _effective_ttl(self) -> float:
+        low = self.max_bytes / 2
+        pressure = max(0.0, (self._bytes - low) / (self.max_bytes - low))
+        return self.ttl * (1 - min(pressure, 1.0))
+
+    def is_expired(self, last_used: float, now: float) -> bool:
+        """Whether something last used at `last_used` (time.monotonic) is idle past the current TTL."""
+        return now - last_used > self._effective_ttl()
+
+    def _drop(self, doc_id: str):
+        _, payload, _ = self._entries.pop(doc_id)
+        self._bytes -= len(payload)
+        payload[:] = bytes(len(payload))
+
+    def get(self, doc_id: str, token: Token) -> Optional[dict]:
+        payload = self.get_payload(doc_id, token)
+        return None if payload is None else _json.loads(payload)
+
+    def get_payload(self, doc_id: str, token: Token) -> Optional[bytes]:
+        """Returns a copy of the cached plaintext JSON, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            if entry is None:
+                return None
+            cached_token, payload, last_used = entry
+            now = time.monotonic()
+            if cached_token != token or now - last_used > self._effective_ttl():
+                self._drop(doc_id)
+                return None
+            self._entries[doc_id] = (cached_token, payload, now)
+            self._entries.move_to_end(doc_id)
+            return bytes(payload)
+
+    def put(self, doc_id: str, token: Token, plaintext: bytes):
+        if len(plaintext) > self.max_bytes:
+            return
+        with self._lock:
+            if doc_id in self._entries:
+                self._drop(doc_id)
+            self._entries[doc_id] = (token, bytearray(plaintext), time.monotonic())
+            self._bytes += len(plaintext)
+            self._evict()
+
+    def _evict(self):
+        # Least recently used first: drop idle entries, then whatever is needed to fit the budget
+        now = time.monotonic()
+        while self._entries:
+            oldest = next(iter(self._entries))
+            if self._bytes <= self.max_bytes and now - self._entries[oldest][2] <= self._effective_ttl():
+                break
+            self._drop(oldest)
+
+    def reserve(self, nbytes: int):
+        """
+        Counts `nbytes` of plaintext held outside the cache against the budget, replacing the
+        previous reservation; entries are dropped as needed to make room.
+        """
+        with self._lock:
+            self._bytes += nbytes - self._reserved
+            self._reserved = nbytes
+            self._evict()
+
+    def discard(self, doc_id: str):
+        with self._lock:
+            if doc_id in self._entries:
+                self._drop(doc_id)
+
+    def wipe(self):
+        """Overwrites every cached plaintext with zeros and empties the cache."""
+        with self._lock:
+            for doc_id in list(self._entries):
+                self._drop(doc_id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
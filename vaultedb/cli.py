@@ -1,18 +1,18 @@
-import argparse
-import json
 import os
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from typing import List, Optional
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-
+from vaultedb import _json
 from vaultedb.errors import StorageError
 from vaultedb.storage import DocumentStorage
 
 
 @dataclass
 class VaultInspectionResult:
+    # Declared by hand: dataclass(slots=True) needs Python 3.10
+    __slots__ = ("file", "created_at", "vault_version", "app_name", "salt", "document_count", "document_ids")
+
     file: str
     created_at: Optional[str]
     vault_version: Optional[str]
@@ -56,6 +56,18 @@ def print_human_output(result: VaultInspectionResult, max_ids: int, quiet: bool)
 
 
 
+def _write_json(obj: dict):
+    # Encoded once (orjson when installed) and written as bytes, skipping the text layer
+    payload = _json.dumps(obj, indent=True) + b"\n"
+    out = getattr(sys.stdout, "buffer", None)
+    if out is None:
+        print(payload.decode("utf-8"), end="")
+        return
+    sys.stdout.flush()
+    out.write(payload)
+    out.flush()
+
+
 def inspect_vault(path: str, max_ids: int = 10, output_json: bool = False, quiet: bool = False):
     try:
         if max_ids < 0:
@@ -66,7 +78,7 @@ def inspect_vault(path: str, max_ids: int = 10, output_json: bool = False, quiet
             sys.exit(1)
 
         store = DocumentStorage(path)
-        meta = dict(store.meta)
+        meta = store.meta
         doc_ids = list(store.data.keys())
 
         result = VaultInspectionResult(
@@ -80,7 +92,7 @@ def inspect_vault(path: str, max_ids: int = 10, output_json: bool = False, quiet
         )
 
         if output_json:
-            print(json.dumps(result.__dict__, indent=2))
+            _write_json({field.name: getattr(result, field.name) for field in fields(result)})
         else:
             print_human_output(result, max_ids, quiet)
 
@@ -95,7 +107,43 @@ def inspect_vault(path: str, max_ids: int = 10, output_json: bool = False, quiet
         sys.exit(1)
 
 
+def _parse_inspect_args(argv: List[str]) -> Optional[tuple]:
+    """
+    Parses the plain `inspect <path> [--max-ids N] [--json] [--quiet]` form without argparse.
+
+    Returns None for anything else (help, unknown or malformed options), which argparse then handles.
+    """
+    if not argv or argv[0] != "inspect":
+        return None
+    path, max_ids, output_json, quiet = None, 10, False, False
+    args = iter(argv[1:])
+    for arg in args:
+        if arg in ("--max-ids", "-n"):
+            value = next(args, "")
+            if not (value.isascii() and value.isdigit()):
+                return None
+            max_ids = int(value)
+        elif arg == "--json":
+            output_json = True
+        elif arg in ("--quiet", "-q"):
+            quiet = True
+        elif arg.startswith("-") or path is not None:
+            return None
+        else:
+            path = arg
+    if path is None:
+        return None
+    return path, max_ids, output_json, quiet
+
+
 def main():
+    # Common invocations skip importing and building the argparse parser
+    fast_args = _parse_inspect_args(sys.argv[1:])
+    if fast_args is not None:
+        inspect_vault(*fast_args)
+        return
+
+    import argparse
     parser = argparse.ArgumentParser(
         description="vaultedb CLI — inspect encrypted .vault files without revealing data",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
@@ -1,30 +1,61 @@
 """
 vaultedb Crypto Module
 
-Provides transparent encryption and decryption using Fernet.
+Provides transparent encryption and decryption using AES-256-GCM.
 - Derives keys from passphrase + salt using PBKDF2
 - Encrypts/Decrypts vaultedb documents (dicts)
 - Includes optional helpers for salt handling and blob packaging
+- Still decrypts legacy Fernet tokens written by earlier versions
 """
 
-import json
-import sys
 import os
-from typing import Dict, Union
-
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from functools import lru_cache
+from typing import Dict, Iterable, List, Union
 
+from vaultedb import _json
 from vaultedb.errors import CryptoError
-from cryptography.fernet import Fernet, InvalidToken
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.backends import default_backend
 import base64
 
+NONCE_SIZE = 12
+
+# Fernet tokens start with version byte 0x80 followed by a big-endian timestamp
+_FERNET_PREFIX = "gAAAAA"
+
+
+def _raw_key(key: bytes) -> bytes:
+    """
+    Returns the 32 raw key bytes, accepting legacy url-safe base64 (Fernet-style) keys too.
+    """
+    if len(key) == 44:
+        return base64.urlsafe_b64decode(key)
+    return key
+
+
+@lru_cache(maxsize=16)
+def _cached_cipher(key: bytes) -> AESGCM:
+    return AESGCM(_raw_key(key))
+
+
+def _cipher_for(key: bytes) -> AESGCM:
+    """
+    Returns an AESGCM instance for the key, reused across calls with the same key.
+    """
+    try:
+        return _cached_cipher(key)
+    except TypeError:  # unhashable key (e.g. bytearray)
+        return AESGCM(_raw_key(key))
+
 
 def generate_key(passphrase: str, salt: bytes, iterations: int = 100_000) -> bytes:
     """
-    Derives a 32-byte Fernet key from the given passphrase and salt.
+    Derives a raw 32-byte AES-256 key from the given passphrase and salt.
+
+    PBKDF2HMAC runs in OpenSSL, whose SHA-256 uses SHA-NI / ARMv8 SHA2 where the CPU has them.
     """
     if not isinstance(passphrase, str) or not isinstance(salt, bytes):
         raise TypeError("Passphrase must be str and salt must be bytes.")
@@ -33,10 +64,27 @@ def generate_key(passphrase: str, salt: bytes, iterations: int = 100_000) -> byt
         algorithm=hashes.SHA256(),
         length=32,
         salt=salt,
-        iterations=iterations,
-        backend=default_backend()
+        iterations=iterations
     )
-    return base64.urlsafe_b64encode(kdf.derive(passphrase.encode()))
+    return kdf.derive(passphrase.encode())
+
+
+@lru_cache(maxsize=32)
+def _derive_key_cached(passphrase: str, salt: bytes, iterations: int = 100_000) -> bytes:
+    """
+    Memoized `generate_key`, used when (re)opening vaults so repeated opens skip PBKDF2.
+
+    Note: the cache keeps passphrases and derived keys in memory; call `clear_key_cache()` to drop them.
+    """
+    return generate_key(passphrase, salt, iterations)
+
+
+def clear_key_cache() -> None:
+    """
+    Drops every derived key memoized by `EncryptedStorage.open`, and the cached ciphers.
+    """
+    _derive_key_cached.cache_clear()
+    _cached_cipher.cache_clear()
 
 
 def generate_salt(length: int = 16) -> bytes:
@@ -46,34 +94,74 @@ def generate_salt(length: int = 16) -> bytes:
     return os.urandom(length)
 
 
-def encrypt_document(doc: Dict, key: bytes) -> str:
+def encrypt_document(doc: Dict, key: bytes) -> bytes:
     """
-    Encrypts a Python dictionary and returns a Fernet token as a base64 string.
+    Encrypts a Python dictionary with AES-256-GCM.
+
+    Returns the raw token: a random 12-byte nonce followed by the ciphertext and tag.
+    Callers that need text (e.g. the JSON vault file) base64-encode it at that boundary.
     """
     if not isinstance(doc, dict):
         raise CryptoError("Document must be a dictionary.")
     try:
-        json_data = json.dumps(doc, ensure_ascii=False).encode("utf-8")
-        f = Fernet(key)
-        return f.encrypt(json_data).decode("utf-8")
+        json_data = _json.dumps(doc)
     except (TypeError, ValueError) as e:
         raise CryptoError(f"Document is not JSON-serializable: {e}")
+    try:
+        nonce = os.urandom(NONCE_SIZE)
+        return nonce + _cipher_for(key).encrypt(nonce, json_data, None)
     except Exception as e:
         raise CryptoError(f"Encryption failed: {e}")
 
 
 def decrypt_document(token: Union[str, bytes], key: bytes) -> dict:
     """
-    Decrypts a document from a Fernet token using the given key.
+    Decrypts a document using the given key.
+
+    Accepts either the raw token from `encrypt_document` or its url-safe base64 text form.
+    Legacy Fernet tokens (base64 text) are still accepted.
     """
     try:
-        f = Fernet(key)
-        decrypted = f.decrypt(token.encode("utf-8"))
-        return json.loads(decrypted.decode("utf-8"))
+        return _json.loads(_decrypt_payload(token, key))
     except Exception as e:
         raise CryptoError(f"Decryption failed: {e}")
 
 
+def decrypt_documents(tokens: Iterable[Union[str, bytes]], key: bytes) -> List[dict]:
+    """
+    Decrypts many tokens under one key; the batch form of `decrypt_document`.
+
+    The cipher, decoder and parser are bound once for the whole batch instead of per token.
+    Tokens the fast path cannot handle (legacy Fernet, corrupt data) go through
+    `decrypt_document`, so failures raise the same CryptoError.
+    """
+    cipher_decrypt = _cipher_for(key).decrypt
+    b64decode = base64.urlsafe_b64decode
+    loads = _json.loads
+    docs = []
+    for token in tokens:
+        try:
+            raw = b64decode(token) if isinstance(token, str) else token
+            docs.append(loads(cipher_decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], None)))
+        except Exception:
+            docs.append(decrypt_document(token, key))
+    return docs
+
+
+def _decrypt_payload(token: Union[str, bytes], key: bytes) -> bytes:
+    """
+    Decrypts a token to its serialized JSON plaintext, without parsing it.
+    """
+    raw = base64.urlsafe_b64decode(token.encode("utf-8")) if isinstance(token, str) else token
+    try:
+        return _cipher_for(key).decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], None)
+    except InvalidTag:
+        if not (isinstance(token, str) and token.startswith(_FERNET_PREFIX)):
+            raise
+        legacy_key = base64.urlsafe_b64encode(_raw_key(key))
+        return Fernet(legacy_key).decrypt(token.encode("utf-8"))
+
+
 def encrypt_with_salt(doc: Dict, passphrase: str) -> str:
     """
     Encrypts a document with a new salt. Returns a string blob in the export_format:
@@ -84,7 +172,7 @@ def encrypt_with_salt(doc: Dict, passphrase: str) -> str:
     try:
         salt = generate_salt()
         key = generate_key(passphrase, salt)
-        token = encrypt_document(doc, key)  # already base64 str
+        token = base64.urlsafe_b64encode(encrypt_document(doc, key)).decode("utf-8")
         salt_b64 = base64.urlsafe_b64encode(salt).decode("utf-8")
         return f"{salt_b64}.{token}"
     except Exception as e:
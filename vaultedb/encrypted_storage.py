@@ -1,18 +1,78 @@
 import base64
-import json
 import os
-import sys
+import time
 import warnings
 from enum import Enum
-from typing import Optional, List
-
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-
-from vaultedb.storage import DocumentStorage
-from vaultedb.crypto import encrypt_document, decrypt_document, CryptoError, generate_salt, generate_key
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Optional, List, Tuple, Union
+
+from vaultedb.storage import DocumentStorage, StorageFormat, _new_id
+from vaultedb import _json
+from vaultedb._pool import parallel_chunks, parallel_map
+from vaultedb.cache import PlaintextCache
+from vaultedb.crypto import encrypt_document, decrypt_document, decrypt_documents, CryptoError, generate_salt, \
+    _derive_key_cached, _decrypt_payload
 from vaultedb.errors import InvalidDocumentError, DuplicateIDError
+from vaultedb.index import FieldIndex
 from vaultedb.logging import VaultAuditLog
-import uuid
+
+
+# indexed_fields="auto" stops adding fields to the index after this many
+_MAX_AUTO_INDEXED_FIELDS = 8
+
+# The whole-vault snapshot holds each document's plaintext JSON and its parsed form, so it is
+# counted against the cache budget at about twice its JSON size
+_SNAPSHOT_COPIES = 2
+
+
+def _encode_token(token: bytes, file_format: StorageFormat) -> Union[str, bytes]:
+    """
+    Stored form of an encrypted token: base64 text in JSON vaults, raw bytes in msgpack vaults.
+    """
+    if file_format == StorageFormat.MSGPACK:
+        return token
+    return base64.urlsafe_b64encode(token).decode("utf-8")
+
+
+def _build_predicate(items: Tuple[tuple, ...]) -> Callable[[dict], bool]:
+    """
+    Builds a matcher that checks `doc.get(field) == value` for every (field, value) pair.
+
+    Multi-field filters are compiled into one short-circuiting `and` chain; fields and values
+    are bound as argument defaults (fast locals), never spliced into the source.
+    None values (which also match missing fields) are compared last, as they rule out the fewest docs.
+    """
+    if not items:
+        return lambda doc: True
+    if len(items) == 1:
+        ((field, value),) = items
+        return lambda doc: doc.get(field) == value
+
+    items = tuple(sorted(items, key=lambda item: item[1] is None))
+    params = ", ".join(f"_k{i}=_items[{i}][0], _v{i}=_items[{i}][1]" for i in range(len(items)))
+    checks = " and ".join(f"get(_k{i}) == _v{i}" for i in range(len(items)))
+    source = f"def predicate(doc, {params}):\n    get = doc.get\n    return {checks}\n"
+    namespace = {"_items": items}
+    exec(source, namespace)
+    return namespace["predicate"]
+
+
+def _predicate_for_key(key: frozenset) -> Callable[[dict], bool]:
+    return _build_predicate(tuple((field, value) for field, _, value in key))
+
+
+def _compile_predicate(filter: dict, cached: Callable[[frozenset], Callable[[dict], bool]]) -> Callable[[dict], bool]:
+    """
+    Compiles a find() filter into a predicate, reusing it for repeated filters through `cached`
+    (an `lru_cache` of `_predicate_for_key`).
+
+    Filters with unhashable values (lists, dicts) are compiled without caching.
+    """
+    try:
+        # The value type is part of the key so that e.g. {"n": 1} and {"n": True} stay distinct
+        return cached(frozenset((field, type(value), value) for field, value in filter.items()))
+    except TypeError:
+        return _build_predicate(tuple(filter.items()))
 
 
 class ExportFormat(str, Enum):
@@ -26,26 +86,244 @@ class EncryptedStorage:
 
     Documents are encrypted before writing to disk and decrypted on read.
     The _id field is stored in plaintext to enable efficient lookup.
+
+    Fields listed in `indexed_fields` get an in-memory equality index, so `find()` filters
+    that only use those fields decrypt the matching documents instead of the whole vault.
+    The index is built on the first such `find()` and kept up to date by this instance's writes.
+    With `indexed_fields="auto"`, a `find()` that has to scan the vault also indexes the filtered
+    fields from the documents it decrypted, so later filters on those fields use the index.
+
+    `journal=True` makes writes append to `<path>.journal` instead of rewriting the vault
+    file; see `DocumentStorage`.
+
+    `cache_bytes > 0` keeps up to that many bytes of decrypted documents in memory (see
+    `vaultedb.cache.PlaintextCache`), so repeated reads skip decryption. This holds plaintext
+    in RAM; `secure_wipe()` overwrites and drops it (best effort).
     """
 
-    def __init__(self, path: str, key: bytes, audit_log: Optional[VaultAuditLog] = None):
+    def __init__(
+            self,
+            path: str,
+            key: bytes,
+            audit_log: Optional[VaultAuditLog] = None,
+            file_format: StorageFormat = StorageFormat.JSON,
+            indexed_fields: Union[Iterable[str], str, None] = None,
+            journal: bool = False,
+            cache_bytes: int = 0,
+            cache_ttl: float = 300.0
+    ):
+        if isinstance(indexed_fields, str) and indexed_fields != "auto":
+            raise ValueError(
+                f"indexed_fields must be an iterable of field names or \"auto\", got {indexed_fields!r}; "
+                f"use [{indexed_fields!r}] to index a single field."
+            )
         if not path.endswith(".vault"):
             warnings.warn(
                 "It's recommended to use a `.vault` extension for encrypted vaultedb files.",
                 UserWarning
             )
         self.key = key
-        self.store = DocumentStorage(path)
+        self.store = DocumentStorage(path, file_format=file_format, journal=journal)
         self.audit_log = audit_log
+        self._auto_index = indexed_fields == "auto"
+        if self._auto_index:
+            self._index: Optional[FieldIndex] = FieldIndex(key, ())
+        else:
+            self._index = FieldIndex(key, indexed_fields) if indexed_fields else None
+        self._index_generation = -1  # store generation the index reflects; -1 = not built yet
+        self._cache = PlaintextCache(cache_bytes, cache_ttl) if cache_bytes > 0 else None
+        self._snapshot: Optional[List[Tuple[dict, bytearray]]] = None
+        self._snapshot_generation = -1  # store generation of _snapshot (None there = not kept)
+        self._snapshot_used = 0.0  # monotonic time _snapshot was last served; it idles out like a cache entry
+        self._columns: Dict[str, list] = {}  # field -> its value in each _snapshot document, built on demand
+        # Compiled find() filters; per instance, as the keys hold plaintext filter values
+        self._predicates = lru_cache(maxsize=128)(_predicate_for_key)
+
+    def _index_is_current(self) -> bool:
+        return self._index is not None and self._index_generation == self.store.generation
+
+    def _rebuild_index(self):
+        self._index = FieldIndex(self.key, self._index.fields)
+        for doc_id, raw in self.store.data.items():
+            self._index.add(doc_id, self._decrypt_raw(raw))
+        self._index_generation = self.store.generation
+
+    def _sync_index(self, was_current: bool, doc_id: str, doc: Optional[dict]):
+        """
+        Applies this instance's own write to the index, provided the index was current before it.
+        """
+        if not was_current:
+            return
+        if doc is None:
+            self._index.remove(doc_id)
+        else:
+            self._index.add(doc_id, doc)
+        self._index_generation = self.store.generation
+
+    def _payload_for(self, raw: dict) -> bytes:
+        """
+        Plaintext JSON of a stored document, from the plaintext cache when possible (cache must be enabled).
+        """
+        token, doc_id = raw["data"], raw["_id"]
+        payload = self._cache.get_payload(doc_id, token)
+        if payload is None:
+            try:
+                payload = _decrypt_payload(token, self.key)
+            except Exception as e:
+                raise CryptoError(f"Decryption failed: {e}")
+            self._cache.put(doc_id, token, payload)
+        return payload
+
+    def _decrypt_cached(self, raw: dict) -> dict:
+        """
+        Decrypts a stored document, going through the plaintext cache when it is enabled.
+        """
+        if self._cache is None or raw.get("_id") is None:
+            return decrypt_document(raw["data"], self.key)
+        return _json.loads(self._payload_for(raw))
+
+    def _plaintext_snapshot(self) -> Optional[List[Tuple[dict, bytearray]]]:
+        """
+        (document, plaintext JSON) pairs for the whole vault at the current store generation.
+
+        Only kept while the plaintext cache is enabled and the snapshot fits its byte budget, which it
+        shares with the cache (see `_SNAPSHOT_COPIES`); returns None otherwise, or if any document fails
+        to decrypt (the regular path then reports or skips it). Left unused for longer than the cache's
+        current TTL, it expires and is rebuilt from the cache. Callers reload the store first and hand
+        out parsed copies only.
+        """
+        if self._cache is None:
+            return None
+        now = time.monotonic()
+        if self._snapshot_generation == self.store.generation and not self._cache.is_expired(self._snapshot_used, now):
+            self._snapshot_used = now
+            return self._snapshot
+
+        self._drop_snapshot()
+        self._snapshot_generation = self.store.generation
+        raw_docs = list(self.store.data.values())
+        # Ciphertext is at least as long as its plaintext, so oversized vaults are skipped before decrypting
+        if sum(len(raw.get("data") or "") for raw in raw_docs) > self._cache.max_bytes:
+            return None
+        try:
+            snapshot = []
+            for raw in raw_docs:
+                payload = self._payload_for(raw)
+                snapshot.append((_json.loads(payload), bytearray(payload)))
+        except (KeyError, CryptoError, ValueError):
+            return None
+        size = _SNAPSHOT_COPIES * sum(len(payload) for _, payload in snapshot)
+        if size > self._cache.max_bytes:
+            return None
+        self._cache.reserve(size)
+        self._snapshot, self._snapshot_used = snapshot, time.monotonic()
+        return snapshot
+
+    def _drop_snapshot(self, wipe: bool = False):
+        """
+        Forgets the snapshot and its columns and releases their share of the cache budget.
+
+        With `wipe`, the snapshot's plaintext JSON buffers are overwritten with zeros first.
+        """
+        if wipe and self._snapshot is not None:
+            for _, payload in self._snapshot:
+                payload[:] = bytes(len(payload))
+        self._snapshot, self._snapshot_generation = None, -1
+        self._columns = {}
+        if self._cache is not None:
+            self._cache.reserve(0)
+
+    def _snapshot_matches(self, snapshot: List[Tuple[dict, bytes]], filter: dict) -> List[int]:
+        """
+        Positions in `snapshot` of the documents matching `filter`, scanned one field column at a time.
+
+        Same semantics as the compiled predicate (`doc.get(field) == value`): the first non-None
+        field narrows the positions, the remaining fields only check those.
+        """
+        if not filter:
+            return list(range(len(snapshot)))
+        items = sorted(filter.items(), key=lambda item: item[1] is None)
+        hits: Optional[List[int]] = None
+        for field, value in items:
+            column = self._columns.get(field)
+            if column is None:
+                column = self._columns[field] = [doc.get(field) for doc, _ in snapshot]
+            if hits is None:
+                hits = [i for i, current in enumerate(column) if current == value]
+            else:
+                hits = [i for i in hits if column[i] == value]
+            if not hits:
+                break
+        return hits
+
+    def batch(self):
+        """
+        Context manager that writes the vault file once for all writes inside it; see `DocumentStorage.batch`.
+        """
+        return self.store.batch()
+
+    def secure_wipe(self):
+        """
+        Overwrites and drops every decrypted document held by the plaintext cache (best effort),
+        and forgets the compiled `find()` filters, whose values are plaintext too.
+
+        The whole-vault snapshot used by `list()`/`find()` has its plaintext JSON overwritten too;
+        its parsed documents and field columns are immutable Python objects, so they are dropped,
+        not overwritten, and their memory is freed by the interpreter.
+        """
+        self._drop_snapshot(wipe=True)
+        self._predicates.cache_clear()
+        if self._cache is not None:
+            self._cache.wipe()
+
+    def _decrypt_raw(self, raw: dict) -> dict:
+        if "data" not in raw:
+            raise CryptoError("Missing encrypted data field in document.")
+        try:
+            return self._decrypt_cached(raw)
+        except Exception as e:
+            raise CryptoError(f"Decryption failed during list operation: {e}")
+
+    def _decrypt_raw_or_none(self, raw: dict) -> Optional[dict]:
+        try:
+            return self._decrypt_raw(raw)
+        except CryptoError:
+            return None
+
+    def _decrypt_batch(self, raw_docs: List[dict], strict: bool) -> List[Optional[dict]]:
+        """
+        Decrypts a slice of stored documents in one `decrypt_documents` call.
+
+        If any of them fails, the slice is redone per document so the failure is reported
+        (or skipped, when not strict) exactly as in the per-document path.
+        """
+        try:
+            return decrypt_documents([raw["data"] for raw in raw_docs], self.key)
+        except (KeyError, CryptoError):
+            decrypt = self._decrypt_raw if strict else self._decrypt_raw_or_none
+            return [decrypt(raw) for raw in raw_docs]
+
+    def _decrypt_many(self, raw_docs: List[dict], strict: bool) -> List[Optional[dict]]:
+        """
+        Decrypts stored documents in order: in batches, or per document through the plaintext cache.
+        """
+        # AES-GCM decryption runs in OpenSSL, so large sets are decrypted on the shared pool
+        if self._cache is None:
+            return parallel_chunks(lambda chunk: self._decrypt_batch(chunk, strict), raw_docs)
+        return list(parallel_map(self._decrypt_raw if strict else self._decrypt_raw_or_none, raw_docs))
 
     def insert(self, doc: dict) -> str:
         if not isinstance(doc, dict):
             raise InvalidDocumentError("Document must be a dictionary.")
-        _id = doc.get("_id") or str(uuid.uuid4())
+        _id = doc.get("_id") or _new_id()
         doc["_id"] = _id  # ensure internal _id matches external
         try:
-            encrypted = encrypt_document(doc, self.key)
+            encrypted = _encode_token(encrypt_document(doc, self.key), self.store.file_format)
+            index_current = self._index_is_current()
             result = self.store.insert({"_id": _id, "data": encrypted})
+            self._sync_index(index_current, _id, doc)
+            if self._cache is not None:
+                self._cache.put(_id, encrypted, _json.dumps(doc))
             if self.audit_log:
                 try:
                     self.audit_log.log("insert", _id)
@@ -57,6 +335,37 @@ class EncryptedStorage:
         except Exception as e:
             raise CryptoError(f"Insertion failed: {e}")
 
+    def insert_many(self, docs: List[dict]) -> List[str]:
+        """
+        Encrypts and inserts all documents with a single vault write; see `DocumentStorage.insert_many`.
+
+        Large inputs are encrypted on the shared thread pool.
+        """
+        if not all(isinstance(doc, dict) for doc in docs):
+            raise InvalidDocumentError("Every document must be a dictionary.")
+        for doc in docs:
+            doc["_id"] = doc.get("_id") or _new_id()
+        file_format = self.store.file_format
+        try:
+            encrypted = list(parallel_map(lambda doc: _encode_token(encrypt_document(doc, self.key), file_format), docs))
+            index_current = self._index_is_current()
+            result = self.store.insert_many([{"_id": doc["_id"], "data": token} for doc, token in zip(docs, encrypted)])
+            for doc, token in zip(docs, encrypted):
+                self._sync_index(index_current, doc["_id"], doc)
+                if self._cache is not None:
+                    self._cache.put(doc["_id"], token, _json.dumps(doc))
+            if self.audit_log:
+                try:
+                    for doc_id in result:
+                        self.audit_log.log("insert", doc_id)
+                except Exception:
+                    pass
+            return result
+        except DuplicateIDError:
+            raise
+        except Exception as e:
+            raise CryptoError(f"Insertion failed: {e}")
+
     def get(self, doc_id: str) -> Optional[dict]:
         raw = self.store.get(doc_id)
         if not raw:
@@ -64,7 +373,7 @@ class EncryptedStorage:
         if "data" not in raw:
             raise CryptoError("Missing encrypted data field.")
         try:
-            doc = decrypt_document(raw["data"], self.key)
+            doc = self._decrypt_cached(raw)
             if self.audit_log:
                 try:
                     self.audit_log.log("get", doc_id)
@@ -82,8 +391,13 @@ class EncryptedStorage:
             return False
         existing.update(updates)
         try:
-            encrypted = encrypt_document(existing, self.key)
+            encrypted = _encode_token(encrypt_document(existing, self.key), self.store.file_format)
+            index_current = self._index_is_current()
             result = self.store.update(doc_id, {"data": encrypted})
+            if result:
+                self._sync_index(index_current, doc_id, existing)
+                if self._cache is not None:
+                    self._cache.put(doc_id, encrypted, _json.dumps(existing))
             if result and self.audit_log:
                 try:
                     self.audit_log.log("update", doc_id, updates)
@@ -94,8 +408,12 @@ class EncryptedStorage:
             raise CryptoError(f"Update failed: {e}")
 
     def delete(self, doc_id: str) -> bool:
+        index_current = self._index_is_current()
         result = self.store.delete(doc_id)
         if result:
+            self._sync_index(index_current, doc_id, None)
+            if self._cache is not None:
+                self._cache.discard(doc_id)
             if self.audit_log:
                 try:
                     self.audit_log.log("delete", doc_id)
@@ -110,30 +428,24 @@ class EncryptedStorage:
 
         If strict is False, skips documents that fail decryption.
         """
-        docs = []
         raw_docs = self.store.list()
 
-        for raw in raw_docs:
-            if "data" not in raw:
-                if strict:
-                    raise CryptoError("Missing encrypted data field in document.")
-                continue
+        snapshot = self._plaintext_snapshot()
+        if snapshot is not None:
+            return [_json.loads(payload) for _, payload in snapshot]
 
-            try:
-                doc = decrypt_document(raw["data"], self.key)
-                docs.append(doc)
-            except Exception as e:
-                if strict:
-                    raise CryptoError(f"Decryption failed during list operation: {e}")
-                # When not in strict mode, skip this document
-                continue
+        results = self._decrypt_many(raw_docs, strict)
 
-        return docs
+        # When not in strict mode, documents that fail decryption come back as None and are skipped
+        return [doc for doc in results if doc is not None]
 
     def find(self, filter: dict) -> List[dict]:
         """
         Finds documents matching all key-value pairs in the given filter.
 
+        A filter on `_id` decrypts at most that document; if every filtered field is in
+        `indexed_fields`, only the index candidates are decrypted.
+
         Args:
             filter (dict): A dictionary of field-value pairs to match.
                            Only documents containing all matching fields with equal values will be returned.
@@ -148,23 +460,66 @@ class EncryptedStorage:
         if not isinstance(filter, dict):
             raise InvalidDocumentError("Filter must be a dictionary.")
 
-        all_docs = self.list(strict=True)
-        results = []
-
-        for doc in all_docs:
-            if all(doc.get(k) == v for k, v in filter.items()):
-                results.append(doc)
-
-        return results
+        predicate = _compile_predicate(filter, self._predicates)
+
+        if isinstance(filter.get("_id"), str):
+            # Documents are stored under their plaintext _id: at most one candidate to decrypt
+            self.store.reload()
+            raw = self.store.data.get(filter["_id"])
+            if raw is None:
+                return []
+            return [doc for doc in self._decrypt_many([raw], strict=True) if predicate(doc)]
+
+        if self._index is not None and self._index.covers(filter):
+            self.store.reload()
+            if not self._index_is_current():
+                self._rebuild_index()
+            candidates = self._index.lookup(filter)
+            if candidates is not None:
+                # Keep the scan's result order (storage order) for multiple matches
+                ordered = [doc_id for doc_id in self.store.data if doc_id in candidates] \
+                    if len(candidates) > 1 else list(candidates)
+                docs = self._decrypt_many([self.store.data[doc_id] for doc_id in ordered], strict=True)
+                return [doc for doc in docs if predicate(doc)]
+
+        if self._cache is not None:
+            self.store.reload()
+            snapshot = self._plaintext_snapshot()
+            if snapshot is not None:
+                # No crypto: scan the cached field columns, copy out only the hits
+                return [_json.loads(snapshot[i][1]) for i in self._snapshot_matches(snapshot, filter)]
+
+        new_fields = tuple(field for field in filter if field not in self._index.fields) if self._auto_index else ()
+        if new_fields and len(self._index.fields) + len(new_fields) <= _MAX_AUTO_INDEXED_FIELDS:
+            docs = self.list(strict=True)
+            # Every document was just decrypted, so index the new fields from them for later filters
+            self._index = FieldIndex(self.key, self._index.fields + new_fields)
+            for doc_id, doc in zip(self.store.data, docs):
+                self._index.add(doc_id, doc)
+            self._index_generation = self.store.generation
+            return [doc for doc in docs if predicate(doc)]
+
+        return [doc for doc in self.list(strict=True) if predicate(doc)]
 
     @classmethod
-    def open(cls, path: str, passphrase: str, enable_logging: bool = False) -> "EncryptedStorage":
+    def open(
+            cls,
+            path: str,
+            passphrase: str,
+            enable_logging: bool = False,
+            file_format: StorageFormat = StorageFormat.JSON,
+            indexed_fields: Union[Iterable[str], str, None] = None,
+            journal: bool = False,
+            cache_bytes: int = 0,
+            cache_ttl: float = 300.0
+    ) -> "EncryptedStorage":
         """
         Initializes EncryptedStorage from a passphrase.
 
         - Loads existing vault and reads embedded salt if present.
-        - For new vaults, generates and embeds a salt.
+        - For new vaults, generates and embeds a salt, using `file_format` for the file.
         - Raises CryptoError if an existing vault lacks salt.
+        - Derived keys are memoized per (passphrase, salt); see `crypto.clear_key_cache()`.
         """
         if not passphrase:
             raise ValueError("Passphrase must not be empty. vaultedb requires a non-empty passphrase for encryption.")
@@ -180,14 +535,15 @@ class EncryptedStorage:
                 salt = probe.salt
             else:
                 salt = generate_salt()
-                DocumentStorage(path, app_name=None, salt=salt)
+                DocumentStorage(path, app_name=None, salt=salt, file_format=file_format)
 
-            key = generate_key(passphrase, salt)
+            key = _derive_key_cached(passphrase, salt)
             audit_log = None
             if enable_logging:
                 log_path = path.replace(".vault", ".vaultlog")
                 audit_log = VaultAuditLog(log_path, key)
-            return cls(path, key, audit_log=audit_log)
+            return cls(path, key, audit_log=audit_log, file_format=file_format, indexed_fields=indexed_fields,
+                       journal=journal, cache_bytes=cache_bytes, cache_ttl=cache_ttl)
 
         except Exception as e:
             raise CryptoError(f"vaultedb failed to load this file — {e}") from e
@@ -237,8 +593,8 @@ class EncryptedStorage:
             if not filepath.endswith(".vaultkey"):
                 filepath += ".vaultkey"
 
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(export, f, indent=2)
+            with open(filepath, "wb") as f:
+                f.write(_json.dumps(export, indent=True))
             return filepath
 
         else:
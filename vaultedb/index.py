@@ -0,0 +1,101 @@
+"""
+vaultedb Index Module
+
+In-memory secondary index used by EncryptedStorage.find().
+- Maps (field, value) pairs to document IDs for a fixed set of indexed fields
+- Values are kept only as HMAC-SHA256 digests under a key derived from the vault key, never as plaintext
+- Lookups return candidate IDs; callers still check candidates against the filter
+"""
+
+import hashlib
+import hmac
+import logging
+from typing import Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# CPython's hashlib uses OpenSSL's SHA-256 (SHA-NI/ARMv8 accelerated) unless built without it
+_OPENSSL_SHA256 = getattr(hashlib.sha256, "__name__", "").startswith("openssl_")
+
+
+def _canonical(value) -> Optional[str]:
+    """
+    Returns a string that is equal for values Python compares as equal (1 == 1.0 == True),
+    or None for values the index does not handle (lists, dicts, ...).
+
+    Distinct values may share a canonical form (e.g. huge ints); that only adds candidates.
+    """
+    if value is None:
+        return "z:"
+    if isinstance(value, str):
+        return "s:" + value
+    if isinstance(value, (bool, int, float)):
+        try:
+            return "n:" + repr(float(value) + 0.0)  # + 0.0 folds -0.0 into 0.0
+        except OverflowError:
+            return "n:" + repr(value)
+    return None
+
+
+class FieldIndex:
+    """
+    Equality index over selected document fields.
+
+    A document missing an indexed field is indexed under `None`, mirroring `doc.get(field) == None`.
+    Values that cannot be indexed are left out; filters on them must fall back to a scan.
+    """
+
+    def __init__(self, key: bytes, fields: Iterable[str]):
+        self.fields = tuple(fields)
+        if not _OPENSSL_SHA256:
+            logger.warning("hashlib is not backed by OpenSSL; vaultedb index hashing will be slow.")
+        index_key = hmac.new(key, b"vaultedb-index", hashlib.sha256).digest()
+        # Keyed HMAC state, copied per digest so the key pads are only hashed once
+        self._mac = hmac.new(index_key, digestmod=hashlib.sha256)
+        self._postings: Dict[str, Dict[bytes, Set[str]]] = {field: {} for field in self.fields}
+        self._doc_digests: Dict[str, Dict[str, bytes]] = {}
+
+    def _digest(self, field: str, value) -> Optional[bytes]:
+        canonical = _canonical(value)
+        if canonical is None:
+            return None
+        mac = self._mac.copy()
+        mac.update(f"{field}\x00{canonical}".encode("utf-8"))
+        return mac.digest()
+
+    def covers(self, filter: dict) -> bool:
+        """True if every field in a non-empty filter is indexed."""
+        return bool(filter) and all(field in self._postings for field in filter)
+
+    def add(self, doc_id: str, doc: dict):
+        self.remove(doc_id)
+        digests = {}
+        for field in self.fields:
+            digest = self._digest(field, doc.get(field))
+            if digest is not None:
+                self._postings[field].setdefault(digest, set()).add(doc_id)
+                digests[field] = digest
+        self._doc_digests[doc_id] = digests
+
+    def remove(self, doc_id: str):
+        for field, digest in self._doc_digests.pop(doc_id, {}).items():
+            ids = self._postings[field].get(digest)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._postings[field][digest]
+
+    def lookup(self, filter: dict) -> Optional[Set[str]]:
+        """
+        Returns candidate IDs for an equality filter, or None if a filter value cannot be indexed.
+        """
+        candidates: Optional[Set[str]] = None
+        for field, value in filter.items():
+            digest = self._digest(field, value)
+            if digest is None:
+                return None
+            ids = self._postings[field].get(digest, set())
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+        return candidates
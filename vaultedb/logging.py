@@ -1,63 +1,132 @@
+import atexit
 import logging
+import mmap
 import os
 import json
-import sys
+import threading
+import time
+import weakref
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Optional, List, Dict, Callable
 import base64
 
-from cryptography.fernet import Fernet, InvalidToken
-
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-
+from vaultedb._io import datasync, write_all
+from vaultedb._pool import parallel_map
+from vaultedb.crypto import encrypt_document, decrypt_document
 from vaultedb.errors import CryptoError
 
 logger = logging.getLogger(__name__)
 
+# Base64 prefix of Fernet tokens written by older versions (see crypto._FERNET_PREFIX)
+_FERNET_LINE_PREFIX = b"gAAAAA"
+
+# Logs smaller than this are cheap enough to tail by decrypting everything
+_TAIL_SCAN_THRESHOLD = 64 * 1024
+
+_DURABILITY_MODES = ("group", "sync", "async")
+
+@lru_cache(maxsize=4)
+def _second_prefix(second: int) -> str:
+    return datetime.fromtimestamp(second, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _timestamp() -> str:
+    """
+    Current UTC time in ISO-8601 with microseconds, e.g. "2025-01-01T12:00:00.000123+00:00".
+
+    The formatted date/time is cached per second, so most calls only format the microseconds.
+    """
+    second, micros = divmod(time.time_ns() // 1000, 1_000_000)
+    return f"{_second_prefix(second)}.{micros:06d}+00:00"
+
+
+# Every live audit log, so buffered entries can be flushed once at interpreter exit
+_live_logs: "weakref.WeakSet[VaultAuditLog]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_logs():
+    for audit_log in list(_live_logs):
+        audit_log.flush()
+
 
 class VaultAuditLog:
     """
     Handles encrypted append-only audit logging for vaultedb operations.
 
-    Each log entry is a base64-encoded, Fernet-encrypted JSON line stored in a `.vaultlog` file.
+    Each log entry is a base64-encoded, AES-GCM-encrypted JSON line stored in a `.vaultlog` file.
     This ensures zero-trust observability: auditability without leaking sensitive data.
 
     Notes:
     - Log file is encrypted using the vault key (no plaintext logs)
     - No key rotation support in MVP (entries use the original vault key)
-    - Performance note: `.entries()` loads full log into memory — acceptable for MVP scope
+    - Performance note: `.entries()` loads full log into memory — acceptable for MVP scope;
+      `.tail(n)` on large logs only decrypts the last `n` lines
+    - Entries are buffered in memory and appended in batches (see `flush()`)
     """
 
-    def __init__(self, log_path: str, key: bytes, on_log_error: Optional[Callable[[Exception], None]] = None):
+    def __init__(
+            self,
+            log_path: str,
+            key: bytes,
+            on_log_error: Optional[Callable[[Exception], None]] = None,
+            buffer_size: int = 64,
+            flush_interval: float = 0.25,
+            durability: str = "group"
+    ):
         """
         Initializes the VaultAuditLog instance.
 
         Args:
             log_path (str): The file path where the audit log will be stored.
-            key (bytes): A Fernet-compatible key used to encrypt/decrypt log entries. Must match the vault key.
+            key (bytes): The 32-byte key used to encrypt/decrypt log entries. Must match the vault key.
             on_log_error (Callable[[Exception], None], optional):
                 A custom error handler function that will be called if an exception occurs during logging.
                 Useful for integrating with external logging systems or alerts (e.g., Sentry, Datadog).
                 If not provided, a fallback logger.warning will be used.
+            buffer_size (int): Number of buffered entries that triggers an immediate flush.
+            flush_interval (float): Seconds after which pending entries are flushed in the background.
+                A value <= 0 disables the background flush; entries are then written on size or explicit `flush()`.
+            durability (str): When written entries reach the disk.
+                - "group": one `fdatasync` per flushed batch; `log(..., wait=True)` blocks until the entry is synced.
+                - "sync": every `log()` call is written and synced before returning.
+                - "async": no sync; the OS writes entries back on its own schedule.
 
         Notes:
         - The log file is encrypted; contents cannot be read without the same key used for the vault.
         - File permissions will be set to 600 (rw-------) if supported by the OS.
+        - The file stays open (O_APPEND) until `close()`; every flush is a single `os.write`.
+        - Buffered entries are flushed by `entries()`, `tail()`, `flush()` and at interpreter exit.
         """
         self.log_path = log_path
-        self.fernet = Fernet(key)
+        self.key = key
         self.on_log_error = on_log_error
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        if durability not in _DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {_DURABILITY_MODES}, got {durability!r}")
+        self.durability = durability
+        self._buf: List[bytes] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
 
-        # Set secure permissions if file is being created
-        if not os.path.exists(self.log_path):
-            with open(self.log_path, "wb") as f:
-                pass
-            try:
-                os.chmod(self.log_path, 0o600)
-            except Exception:
-                pass  # Don't fail if platform doesn't support chmod
+        # One append-only descriptor for the lifetime of the log; created with 600 permissions
+        self._fd: Optional[int] = self._open_fd()
 
-    def log(self, op: str, doc_id: str, meta: Optional[Dict] = None):
+        _live_logs.add(self)
+
+    def _open_fd(self) -> int:
+        return os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+
+    def _handle_error(self, e: Exception):
+        if self.on_log_error:
+            self.on_log_error(e)
+        else:
+            # Default fallback for MVP: log warning
+            logger.warning("VaultAuditLog failed to log operation: %s", e)
+
+    def log(self, op: str, doc_id: str, meta: Optional[Dict] = None, wait: bool = False):
         """
         Records an encrypted audit log entry.
 
@@ -65,26 +134,100 @@ class VaultAuditLog:
             op (str): Operation type (e.g., "insert", "get", "update", "delete")
             doc_id (str): Document ID involved in the operation
             meta (dict, optional): Additional metadata (e.g. app label, keys touched)
+            wait (bool): Return only once the entry has been written (and synced, unless durability is "async").
+                Implied by durability="sync".
         """
         meta = meta or {}
         entry = {
             "op": op,
             "_id": doc_id,
-            "at": datetime.now(timezone.utc).isoformat(),
+            "at": _timestamp(),
             "meta": meta,
         }
 
         try:
-            serialized = json.dumps(entry, ensure_ascii=False).encode("utf-8")
-            encrypted = self.fernet.encrypt(serialized)
-            with open(self.log_path, "ab") as f:
-                f.write(encrypted + b"\n")
+            encrypted = base64.urlsafe_b64encode(encrypt_document(entry, self.key))
         except Exception as e:
-            if self.on_log_error:
-                self.on_log_error(e)
-            else:
-                # Default fallback for MVP: log warning
-                logger.warning("VaultAuditLog failed to log operation: %s", e)
+            self._handle_error(e)
+            return
+
+        with self._lock:
+            self._buf.append(encrypted + b"\n")
+            full = wait or self.durability == "sync" or len(self._buf) >= self.buffer_size
+            if not full and self._timer is None and self.flush_interval > 0:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Appends all buffered entries to the log file with a single write, followed by
+        one `fdatasync` unless durability is "async".
+
+        The lock is held for the write and the sync, so a caller that arrives during a flush
+        waits for it and then finds its entry already on disk (group commit).
+
+        Write failures are reported through `on_log_error` (or a warning) and the batch is dropped,
+        matching the behaviour of a failed unbuffered `log()` call.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._buf:
+                return
+            batch, self._buf = self._buf, []
+
+            try:
+                if self._fd is None:
+                    self._fd = self._open_fd()
+                write_all(self._fd, b"".join(batch))
+                if self.durability != "async":
+                    datasync(self._fd)
+                return
+            except Exception as e:
+                error = e
+
+        self._handle_error(error)
+
+    def close(self):
+        """
+        Flushes pending entries and closes the log file descriptor.
+
+        Logging after `close()` transparently reopens the file.
+        """
+        self.flush()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def __del__(self):
+        # Unreachable logs are gone from _live_logs, so the exit flush would never see their pending entries
+        try:
+            self.flush()
+        except Exception:
+            pass
+        fd = getattr(self, "_fd", None)
+        if fd is not None:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _decrypt_line(self, line: bytes) -> Dict:
+        line = line.strip()
+        try:
+            if line.startswith(_FERNET_LINE_PREFIX):
+                # Possibly a legacy Fernet entry; the text path handles both token kinds
+                return decrypt_document(line.decode("utf-8"), self.key)
+            # Decode straight from the file bytes, skipping the bytes -> str -> bytes round trip
+            return decrypt_document(base64.urlsafe_b64decode(line), self.key)
+        except (CryptoError, ValueError) as e:
+            raise CryptoError("Failed to decrypt audit log entry.") from e
 
     def entries(self) -> List[Dict]:
         """
@@ -96,34 +239,59 @@ class VaultAuditLog:
         Raises:
             CryptoError: If a line cannot be decrypted
         """
-        entries = []
+        self.flush()
         if not os.path.exists(self.log_path):
-            return entries
+            return []
 
         try:
+            lines = []
             with open(self.log_path, "rb") as f:
-                for line in f:
-                    try:
-                        decrypted = self.fernet.decrypt(line.strip())
-                        entries.append(json.loads(decrypted.decode("utf-8")))
-                    except InvalidToken as e:
-                        raise CryptoError("Failed to decrypt audit log entry.") from e
+                if os.fstat(f.fileno()).st_size == 0:
+                    return []
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    start, size = 0, len(mm)
+                    while start < size:
+                        end = mm.find(b"\n", start)
+                        if end == -1:
+                            end = size
+                        lines.append(mm[start:end])
+                        start = end + 1
+            # Large logs are decrypted on the shared pool, keeping file order
+            return list(parallel_map(self._decrypt_line, lines))
         except Exception as e:
             raise CryptoError("Failed to read audit log.") from e
 
-        return entries
-
     def tail(self, n: int = 10) -> List[Dict]:
         """
         Returns the last `n` decrypted log entries.
 
+        Large logs are scanned backwards from the end of the file, so only the
+        last `n` lines are decrypted.
+
         Args:
             n (int): Number of entries to return
 
         Returns:
             List[Dict]: Most recent decrypted entries
         """
-        return self.entries()[-n:]
+        self.flush()
+        if n <= 0 or not os.path.exists(self.log_path) or os.path.getsize(self.log_path) < _TAIL_SCAN_THRESHOLD:
+            return self.entries()[-n:]
+
+        try:
+            with open(self.log_path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    lines = []
+                    end = len(mm)
+                    if mm[end - 1:end] == b"\n":
+                        end -= 1
+                    while len(lines) < n and end >= 0:
+                        start = mm.rfind(b"\n", 0, end) + 1
+                        lines.append(mm[start:end])
+                        end = start - 1
+                    return [self._decrypt_line(line) for line in reversed(lines)]
+        except Exception as e:
+            raise CryptoError("Failed to read audit log.") from e
 
     def export_json(self, filepath: str):
         """
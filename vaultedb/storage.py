@@ -2,12 +2,88 @@ import base64
 import json
 import os
 import tempfile
+import time
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 import uuid
+from enum import Enum
+from vaultedb import _json
+from vaultedb._io import datasync, write_all
 from vaultedb.errors import InvalidDocumentError, DuplicateIDError, StorageError
 from vaultedb.config import vaultedb_VERSION
 
+try:
+    import msgpack
+except ImportError:  # only needed for StorageFormat.MSGPACK vaults
+    msgpack = None
+
+# Binary vaults start with this header; JSON vaults always start with "{"
+MSGPACK_MAGIC = b"VDB1"
+
+# Journal mode folds the journal into the snapshot once it outgrows both twice the snapshot and this size
+_MIN_COMPACT_BYTES = 64 * 1024
+
+
+class StorageFormat(str, Enum):
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+
+# Parsed vault files, so reopening an unchanged file skips reading and parsing it:
+# abspath -> ((inode, mtime_ns, size), parsed content, StorageFormat)
+_parsed_files: Dict[str, tuple] = {}
+_PARSED_CACHE_SIZE = 8
+
+# Files modified this recently are not cached: with coarse filesystem timestamps, a same-size
+# in-place edit in the same tick would keep the old signature. 3 s covers FAT's 2 s mtime
+# resolution; a network filesystem whose server clock runs ahead of ours by more is not covered
+_RACY_WINDOW_NS = 3_000_000_000
+
+_SCALAR_TYPES = (str, bytes, int, float, bool, type(None))
+
+
+def _file_signature(st: os.stat_result) -> tuple:
+    # os.replace gives every rewrite a new inode, so in-place edits are the only case mtime/size must catch
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _is_flat_vault(raw) -> bool:
+    if not (isinstance(raw, dict) and isinstance(raw.get("_meta"), dict) and isinstance(raw.get("documents"), dict)):
+        return False
+    return all(
+        isinstance(doc, dict) and all(isinstance(value, _SCALAR_TYPES) for value in doc.values())
+        for doc in raw["documents"].values()
+    ) and all(isinstance(value, _SCALAR_TYPES) for value in raw["_meta"].values())
+
+
+def _copy_parsed(raw: dict) -> dict:
+    return {
+        "_meta": dict(raw["_meta"]),
+        "documents": {doc_id: dict(doc) for doc_id, doc in raw["documents"].items()},
+    }
+
+
+# Pre-generated document ids: one os.urandom call covers _ID_BATCH inserts
+_ID_BATCH = 256
+_id_pool: List[str] = []
+
+
+def _new_id() -> str:
+    """Returns a random UUID4 string, the same format as str(uuid.uuid4())."""
+    try:
+        return _id_pool.pop()
+    except IndexError:
+        rnd = os.urandom(16 * _ID_BATCH)
+        # list.extend/pop are atomic, so concurrent refills only ever add distinct ids
+        _id_pool.extend([str(uuid.UUID(bytes=rnd[i:i + 16], version=4)) for i in range(0, len(rnd), 16)])
+        return _id_pool.pop()
+
+
+if hasattr(os, "register_at_fork"):
+    # A forked child must not hand out the ids its parent still holds
+    os.register_at_fork(after_in_child=_id_pool.clear)
+
 
 class ProtectedMetaDict(dict):
     """
@@ -22,7 +98,7 @@ class ProtectedMetaDict(dict):
     and attempts to modify them after creation will raise a RuntimeError.
     """
 
-    _protected_keys = {"created_at", "vault_version", "salt"}
+    _protected_keys = frozenset({"created_at", "vault_version", "salt"})
 
     def __setitem__(self, key, value):
         if key in self._protected_keys:
@@ -30,9 +106,15 @@ class ProtectedMetaDict(dict):
         super().__setitem__(key, value)
 
     def update(self, *args, **kwargs):
-        for key in dict(*args, **kwargs):
-            if key in self._protected_keys:
-                raise RuntimeError(f"'{key}' is read-only metadata")
+        if len(args) > 1:
+            raise TypeError(f"update expected at most 1 argument, got {len(args)}")
+        if args and not hasattr(args[0], "keys"):
+            args = (dict(args[0]),)  # an iterable of pairs can only be read once
+        # Mappings are checked through their keys, without copying them
+        for source in (*args, kwargs):
+            for key in source.keys():
+                if key in self._protected_keys:
+                    raise RuntimeError(f"'{key}' is read-only metadata")
         super().update(*args, **kwargs)
 
 
@@ -64,13 +146,51 @@ class DocumentStorage:
     - Validate input types
     - Support listing all documents
     - Enforce unique _id per document
+
+    The same structure can also be stored as MessagePack (`StorageFormat.MSGPACK`),
+    prefixed with the `VDB1` header. The on-disk format is detected on load, so
+    `file_format` only matters when a new vault is created.
+
+    With `journal=True`, writes append one record to `<path>.journal` (kept open
+    between writes; see `close()`) instead of rewriting the whole file, and the
+    journal is compacted into the file once it outgrows twice its size. A journal
+    is always replayed on load, whatever the mode; its first record names the
+    snapshot (`_meta["journal_base"]`) it applies to, so a journal left behind by
+    an interrupted compaction is ignored rather than replayed twice.
     """
 
-    def __init__(self, path: str, app_name: Optional[str] = None, salt: Optional[bytes] = None):
+    def __init__(
+            self,
+            path: str,
+            app_name: Optional[str] = None,
+            salt: Optional[bytes] = None,
+            file_format: StorageFormat = StorageFormat.JSON,
+            journal: bool = False
+    ):
         self.path = path
+        self.journal = journal
+        self._journal_path = path + ".journal"
+        # Where snapshot writes stage their temp file: next to the vault, so os.replace stays on one filesystem
+        self._temp_dir = os.path.dirname(path) or "."
+        self._temp_prefix = os.path.basename(path) + "."
+        self._journal_bytes = 0  # size of the journal that applies to the loaded snapshot; 0 = none
+        self._journal_torn = 0  # bytes of a torn final record after _journal_bytes, cut off before the next append
+        self._journal_fd: Optional[int] = None  # append-only descriptor, kept open between writes
+        self._batch_depth = 0
+        self._batch_dirty = False
+        self._snapshot_bytes = 0
+        self._vault_signature: Optional[tuple] = None  # vault file this instance last read or wrote
+        self._journaled_meta: dict = {}  # meta as of the snapshot plus journal on disk
         self.meta: ProtectedMetaDict = ProtectedMetaDict()
         self.data: Dict[str, dict] = {}
         self.salt: Optional[bytes] = None
+        self.file_format = StorageFormat(file_format)
+        # Bumped whenever `data` changes, so layers above can tell when derived state is stale
+        self.generation = 0
+        # (vault, journal) file signatures as of the last load; None = unknown, reload must re-read
+        self._loaded_signature: Optional[tuple] = None
+        if self.file_format == StorageFormat.MSGPACK and msgpack is None:
+            raise StorageError("The msgpack package is required for StorageFormat.MSGPACK vaults.")
 
         # If salt provided and no file exists → initialize new vault with salt
         if salt is not None and not os.path.exists(path):
@@ -78,41 +198,307 @@ class DocumentStorage:
             self.data = {}
             self._atomic_write()
         else:
+            signature = self._disk_signature()
             self._load(app_name)
+            self._loaded_signature = signature
+
+    def _disk_signature(self) -> Optional[tuple]:
+        """
+        Signatures of the vault file and its journal (None for a missing file), taken before reading them.
+
+        Returns None if either changed too recently for its signature to be trusted.
+        """
+        signatures = []
+        for path in (self.path, self._journal_path):
+            try:
+                signature = _file_signature(os.stat(path))
+            except FileNotFoundError:
+                signatures.append(None)
+                continue
+            if time.time_ns() - signature[1] < _RACY_WINDOW_NS:
+                return None
+            signatures.append(signature)
+        return tuple(signatures)
 
     def _load(self, app_name: Optional[str]):
+        self._vault_signature = None
         if not os.path.exists(self.path):
             self._initialize_meta(app_name)
             self.data = {}
             return
 
         try:
-            with open(self.path, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                if not content:
-                    self._initialize_meta(app_name)
-                    self.data = {}
-                    return
-
-                raw = json.loads(content)
-                if "_meta" in raw and "documents" in raw:
-                    self.meta = ProtectedMetaDict(raw["_meta"])
-                    self.data = raw["documents"]
-
-                    salt_b64 = self.meta.get("salt")
-                    if salt_b64:
-                        import base64
-                        self.salt = base64.urlsafe_b64decode(salt_b64.encode("utf-8"))
-                    else:
-                        self.salt = None  # Vault created without salt? Should raise if used for passphrase
+            raw = self._read_cached()
+            if raw is None:
+                with open(self.path, "rb") as f:
+                    signature = _file_signature(os.fstat(f.fileno()))
+                    content = f.read()
+                self._vault_signature = signature
+                self._snapshot_bytes = len(content)
+
+                if content.startswith(MSGPACK_MAGIC):
+                    raw = self._decode_msgpack(content)
+                    self.file_format = StorageFormat.MSGPACK
                 else:
-                    raise StorageError("Vault file is not in supported export_format (missing _meta or documents).")
+                    content = content.strip()
+                    if not content:
+                        self._initialize_meta(app_name)
+                        self.data = {}
+                        return
+                    raw = _json.loads(content)
+                    self.file_format = StorageFormat.JSON
+                raw = self._remember_parsed(signature, raw)
+
+            if isinstance(raw, dict) and "_meta" in raw and "documents" in raw:
+                self.meta = ProtectedMetaDict(raw["_meta"])
+                self.data = raw["documents"]
 
+                salt_b64 = self.meta.get("salt")
+                if salt_b64:
+                    self.salt = base64.urlsafe_b64decode(salt_b64.encode("utf-8"))
+                else:
+                    self.salt = None  # Vault created without salt? Should raise if used for passphrase
 
-        except (json.JSONDecodeError, IOError) as e:
+                self._replay_journal()
+            else:
+                raise StorageError("Vault file is not in supported export_format (missing _meta or documents).")
+
+        except (json.JSONDecodeError, UnicodeDecodeError, IOError) as e:
             raise StorageError(
                 "vaultedb failed to load this file — it is not valid JSON and may be corrupted or tampered with.") from e
 
+    def _read_cached(self) -> Optional[dict]:
+        """
+        Returns a private copy of this file's parsed content if it is unchanged since it was last parsed.
+        """
+        cached = _parsed_files.get(os.path.abspath(self.path))
+        if cached is None:
+            return None
+        signature, raw, file_format = cached
+        st = os.stat(self.path)
+        if _file_signature(st) != signature:
+            return None
+        self._vault_signature = signature
+        self._snapshot_bytes = st.st_size
+        self.file_format = file_format
+        return _copy_parsed(raw)
+
+    def _remember_parsed(self, signature: tuple, raw) -> dict:
+        """
+        Caches freshly parsed content for later loads of the same file; returns the copy to use.
+
+        Only vaults whose documents hold scalar values are cached (always the case for encrypted
+        vaults), so a per-document shallow copy fully separates instances.
+        """
+        key = os.path.abspath(self.path)
+        _parsed_files.pop(key, None)
+        if time.time_ns() - signature[1] < _RACY_WINDOW_NS or not _is_flat_vault(raw):
+            return raw
+        _parsed_files[key] = (signature, raw, self.file_format)
+        while len(_parsed_files) > _PARSED_CACHE_SIZE:
+            _parsed_files.pop(next(iter(_parsed_files)))
+        return _copy_parsed(raw)
+
+    @staticmethod
+    def _decode_msgpack(content: bytes) -> dict:
+        if msgpack is None:
+            raise StorageError("This vault uses the msgpack format; install the msgpack package to open it.")
+        try:
+            return msgpack.unpackb(content[len(MSGPACK_MAGIC):], raw=False)
+        except Exception as e:
+            raise StorageError(
+                "vaultedb failed to load this file — it is not valid msgpack and may be corrupted or tampered with.") from e
+
+    def _encode_record(self, record: dict) -> bytes:
+        if self.file_format == StorageFormat.MSGPACK:
+            return msgpack.packb(record, use_bin_type=True)
+        return _json.dumps(record) + b"\n"
+
+    def _decode_records(self, content: bytes) -> Tuple[List[dict], int]:
+        """
+        Decodes journal records, dropping a torn final record left by an interrupted append.
+
+        Also returns the offset just past the last complete record, where the next append must go.
+        """
+        if self.file_format == StorageFormat.MSGPACK:
+            unpacker = msgpack.Unpacker(raw=False)
+            unpacker.feed(content)
+            records = []
+            end = 0
+            try:
+                for record in unpacker:
+                    records.append(record)
+                    end = unpacker.tell()
+            except Exception as e:
+                raise StorageError(f"Journal is corrupted: {e}") from e
+            return records, end
+
+        records = []
+        end = 0
+        while end < len(content):
+            newline = content.find(b"\n", end)
+            if newline == -1:
+                break  # torn final record (every record ends with a newline); it was never acknowledged
+            line = content[end:newline]
+            if line.strip():
+                try:
+                    records.append(_json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                    raise StorageError(f"Journal is corrupted: {e}") from e
+            end = newline + 1
+        return records, end
+
+    def _replay_journal(self):
+        self._close_journal()
+        self._journal_bytes = self._journal_torn = 0
+        self._journaled_meta = dict(self.meta)
+        base = self.meta.get("journal_base")
+        if base is None or not os.path.exists(self._journal_path):
+            return
+
+        with open(self._journal_path, "rb") as f:
+            content = f.read()
+        records, end = self._decode_records(content)
+        if not records or records[0].get("op") != "base" or records[0].get("base") != base:
+            return  # journal of an older snapshot, already folded in
+
+        for record in records[1:]:
+            if record["op"] == "put":
+                self.data[record["_id"]] = record["doc"]
+            elif record["op"] == "del":
+                self.data.pop(record["_id"], None)
+            elif record["op"] == "meta":
+                self.meta = ProtectedMetaDict(record["meta"])
+        self._journaled_meta = dict(self.meta)
+        self._journal_bytes = end
+        self._journal_torn = len(content) - end
+
+    def _journal_is_current(self) -> bool:
+        """
+        Whether the files on disk are still exactly the snapshot and journal this instance appends to.
+
+        They are not once another writer has rewritten the vault (folding in and removing the
+        journal) or appended to the journal itself.
+        """
+        try:
+            try:
+                vault_signature = _file_signature(os.stat(self.path))
+            except FileNotFoundError:
+                vault_signature = None  # still current if this instance never saw the file either
+            if vault_signature != self._vault_signature:
+                return False
+            if not self._journal_bytes:
+                if not os.path.exists(self._journal_path):
+                    return True
+                # A journal of an older snapshot may be replaced; one on this snapshot was written by someone else
+                with open(self._journal_path, "rb") as f:
+                    records, _ = self._decode_records(f.read())
+                return not records or records[0].get("base") != self.meta.get("journal_base")
+            st = os.stat(self._journal_path)
+            if self._journal_fd is not None:
+                fd_st = os.fstat(self._journal_fd)
+                if fd_st.st_nlink == 0 or fd_st.st_ino != st.st_ino:
+                    return False
+            return st.st_size == self._journal_bytes + self._journal_torn
+        except FileNotFoundError:
+            return False
+
+    def _append_record(self, record: dict):
+        if "journal_base" not in self.meta:
+            # First journaled write: a fresh snapshot (already containing this change) becomes the base
+            self._atomic_write()
+            return
+
+        # Appending to a stale journal would write a record nobody replays
+        self._refuse_stale_write()
+
+        try:
+            payload = self._encode_record(record)
+            meta = dict(self.meta)
+            if meta != self._journaled_meta:
+                # Metadata changed since the last record: journal it ahead of this write
+                payload = self._encode_record({"op": "meta", "meta": meta}) + payload
+            if not self._journal_bytes:
+                # Start a new journal, replacing any stale one
+                self._close_journal()
+                payload = self._encode_record({"op": "base", "base": self.meta["journal_base"]}) + payload
+                self._journal_fd = os.open(self._journal_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            elif self._journal_fd is None:
+                self._journal_fd = os.open(self._journal_path, os.O_WRONLY | os.O_APPEND)
+            if self._journal_torn:
+                # Appending after a torn record would leave this one unreadable too
+                os.ftruncate(self._journal_fd, self._journal_bytes)
+                self._journal_torn = 0
+            write_all(self._journal_fd, payload)
+            datasync(self._journal_fd)  # the change is durable once insert/update/delete returns
+            self._journal_bytes += len(payload)
+            self._journaled_meta = meta
+        except Exception as e:
+            raise StorageError(f"Journal append failed: {e}")
+
+        if self._journal_bytes > max(2 * self._snapshot_bytes, _MIN_COMPACT_BYTES):
+            self.compact()
+
+    def _refuse_stale_write(self):
+        """
+        Raises StorageError, after reloading memory from disk, if another writer changed the vault
+        or its journal since this instance last read or wrote them.
+        """
+        if not self._journal_is_current():
+            self._close_journal()
+            self.reload()
+            raise StorageError("The vault was changed by another writer; the write was not saved. Retry it.")
+
+    def _close_journal(self):
+        if self._journal_fd is not None:
+            os.close(self._journal_fd)
+            self._journal_fd = None
+
+    def close(self):
+        """
+        Closes the journal file, if one is open. Later writes reopen it.
+        """
+        self._close_journal()
+
+    def __del__(self):
+        try:
+            self._close_journal()
+        except Exception:
+            pass
+
+    def _persist(self, record: dict):
+        self._loaded_signature = None  # memory is ahead of disk until the write lands
+        if self._batch_depth:
+            self._batch_dirty = True
+        elif self.journal:
+            self._append_record(record)
+        else:
+            self._atomic_write()
+
+    @contextmanager
+    def batch(self):
+        """
+        Groups writes: inside the block, insert/update/delete only change memory, and the
+        file is written once on exit (even if the block raises, so memory and disk agree).
+
+        Reloads are skipped while a batch is open so unsaved changes are not discarded.
+        Batches may be nested; the outermost one writes.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._batch_dirty:
+                self._batch_dirty = False
+                self._atomic_write()
+
+    def compact(self):
+        """
+        Rewrites the vault file with every change and discards the journal.
+        """
+        self._atomic_write()
+
     def _initialize_meta(self, app_name: Optional[str], salt: Optional[bytes] = None):
         meta = {
             "vault_version": vaultedb_VERSION,
@@ -124,31 +510,100 @@ class DocumentStorage:
             meta["salt"] = base64.urlsafe_b64encode(salt).decode("utf-8")
         self.meta = ProtectedMetaDict(meta)
 
+    def _replace_file(self, payload: bytes) -> tuple:
+        # The new content reaches the disk before the rename, so a crash leaves the old vault or the new one
+        fd, temp_path = tempfile.mkstemp(dir=self._temp_dir, prefix=self._temp_prefix, suffix=".tmp")
+        try:
+            try:
+                write_all(fd, payload)
+                datasync(fd)
+                signature = _file_signature(os.fstat(fd))  # renaming keeps inode, mtime and size
+            finally:
+                os.close(fd)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        return signature
+
     def _atomic_write(self):
+        journal_exists = os.path.exists(self._journal_path)
+        if self.journal or journal_exists:
+            # The snapshot replaces the journal, so records another writer appended to it must be in memory
+            self._refuse_stale_write()
         try:
+            if self.journal or journal_exists:
+                # Any journal on disk is folded into this snapshot and must not be replayed on top of it
+                self.meta["journal_base"] = uuid.uuid4().hex
             file_content = {
                 "_meta": dict(self.meta),
                 "documents": self.data
             }
-            with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(self.path), delete=False) as tf:
-                json.dump(file_content, tf, indent=2)
-                temp_path = tf.name
-            os.replace(temp_path, self.path)
+            if self.file_format == StorageFormat.MSGPACK:
+                payload = MSGPACK_MAGIC + msgpack.packb(file_content, use_bin_type=True)
+            else:
+                payload = _json.dumps(file_content, indent=True)
+            self._vault_signature = self._replace_file(payload)
+            _parsed_files.pop(os.path.abspath(self.path), None)
+            self._snapshot_bytes = len(payload)
+            self._journal_bytes = self._journal_torn = 0
+            self._journaled_meta = dict(self.meta)
+            if journal_exists:
+                self._close_journal()
+                os.remove(self._journal_path)
         except Exception as e:
             raise StorageError(f"Atomic write failed: {e}")
 
     def insert(self, doc: dict) -> str:
         if not isinstance(doc, dict):
             raise InvalidDocumentError("Document must be a dictionary.")
-        doc_id = doc.get("_id") or str(uuid.uuid4())
+        doc_id = doc.get("_id") or _new_id()
         if doc_id in self.data:
             raise DuplicateIDError(f"Document with _id '{doc_id}' already exists.")
         doc["_id"] = doc_id
         self.data[doc_id] = doc
-        self._atomic_write()
+        self.generation += 1
+        self._persist({"op": "put", "_id": doc_id, "doc": doc})
         return doc_id
 
+    def insert_many(self, docs: List[dict]) -> List[str]:
+        """
+        Inserts all documents with a single file write and returns their ids in order.
+
+        Nothing is inserted if any document is invalid, reuses an existing `_id` or repeats one
+        within `docs`, or if the write fails. Inside an open `batch()` the write is left to the batch.
+        """
+        if not all(isinstance(doc, dict) for doc in docs):
+            raise InvalidDocumentError("Every document must be a dictionary.")
+        ids = [doc.get("_id") or _new_id() for doc in docs]
+        seen = set()
+        for doc_id in ids:
+            if doc_id in self.data or doc_id in seen:
+                raise DuplicateIDError(f"Document with _id '{doc_id}' already exists.")
+            seen.add(doc_id)
+
+        try:
+            with self.batch():
+                for doc_id, doc in zip(ids, docs):
+                    doc["_id"] = doc_id
+                    self.data[doc_id] = doc
+                    self._persist({"op": "put", "_id": doc_id, "doc": doc})
+                self.generation += 1
+        except StorageError:
+            # The write failed, so memory goes back to what is on disk
+            for doc_id in ids:
+                self.data.pop(doc_id, None)
+            self.generation += 1
+            raise
+        return ids
+
     def get(self, doc_id: str) -> Optional[dict]:
+        """
+        Returns the stored document itself, not a copy; change it through `update()`.
+        """
         return self.data.get(doc_id)
 
     def update(self, doc_id: str, updates: dict) -> bool:
@@ -157,16 +612,36 @@ class DocumentStorage:
         if doc_id not in self.data:
             return False
         self.data[doc_id].update(updates)
-        self._atomic_write()
+        self.generation += 1
+        self._persist({"op": "put", "_id": doc_id, "doc": self.data[doc_id]})
         return True
 
     def delete(self, doc_id: str) -> bool:
         if doc_id in self.data:
             del self.data[doc_id]
-            self._atomic_write()
+            self.generation += 1
+            self._persist({"op": "del", "_id": doc_id})
             return True
         return False
 
+    def reload(self):
+        """
+        Re-reads the vault file, picking up changes made by other writers.
+        """
+        if self._batch_depth:
+            return
+        signature = self._disk_signature()
+        if signature is not None and signature == self._loaded_signature:
+            return  # neither the vault file nor its journal changed since they were read
+        previous = self.data
+        self._load(app_name=None)
+        self._loaded_signature = signature
+        if self.data != previous:
+            self.generation += 1
+
     def list(self) -> List[dict]:
-        self._load(app_name=None)  # reload to ensure freshness
+        """
+        Returns the stored documents themselves (no copies), after picking up external changes.
+        """
+        self.reload()  # reload to ensure freshness
         return list(self.data.values())